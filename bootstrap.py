@@ -0,0 +1,152 @@
+import asyncio
+import os
+import time
+from typing import Final
+
+import discord
+from discord.ext import commands
+from dotenv import load_dotenv
+
+from startup import timeline, Deferred
+from test import KEY
+from robotevents import RobotEventsClient
+from response_cache import ResponseCache
+from warm_cache import DiskCache, WarmStart
+from team_index import TeamIndex
+from leaderboard import SkillsLeaderboard
+from features import FeatureStore
+from inference import InferenceBatcher, ModelRegistry
+from event_table import EventTables
+from preferences import open_preferences
+from pagination import Paginator
+from metrics import Metrics, track_client
+
+# Everything both bots share: settings, the RobotEvents client and its caches, preferences, metrics
+# and the discord.py hooks that time commands and flush state on shutdown. Each entry point picks
+# its own models and commands on top of this.
+load_dotenv()
+APITOKEN: Final[str] = os.getenv('API_KEY')
+APITOKEN2: Final[str] = os.getenv('API_KEY2')
+DB_URL: Final[str] = os.getenv('DB_URL')
+RESPONSE_CACHE_MB: Final[int] = int(os.getenv('RESPONSE_CACHE_MB', 64))
+METRICS_FILE: Final[str] = os.getenv('METRICS_FILE', 'metrics.prom')
+METRICS_PORT: Final[int] = int(os.getenv('METRICS_PORT', 0))
+# Defaults to preferences.db, or preferences-offline.db for the offline backend
+PREFERENCES_DB: Final[str] = os.getenv('PREFERENCES_DB')
+BATCH_WINDOW_MS: Final[float] = float(os.getenv('BATCH_WINDOW_MS', 5))
+BATCH_MAX_ROWS: Final[int] = int(os.getenv('BATCH_MAX_ROWS', 256))
+
+metrics = Metrics()
+response_cache = ResponseCache(RESPONSE_CACHE_MB * 2 ** 20)
+api = RobotEventsClient([APITOKEN, APITOKEN2], cache=response_cache, metrics=metrics)
+track_client(metrics, api)
+team_index = TeamIndex()
+leaderboard = SkillsLeaderboard(api)
+feature_store = FeatureStore()
+# Responses and team features saved by the previous run, reloaded once the gateway is up
+warm_start = WarmStart(DiskCache(), response_cache, feature_store, timeline=timeline)
+event_tables = EventTables()
+paginator = Paginator()
+metrics.gauge("pagination_sessions", lambda: len(paginator))
+
+
+def connect_database():
+    # firebase_admin pulls in the Google client libraries, so it is imported off the event loop
+    import firebase_admin
+    from firebase_admin import credentials, db
+    firebase_admin.initialize_app(credentials.Certificate(KEY), {
+        'databaseURL' : DB_URL
+    })
+    return db
+
+database = Deferred(connect_database, timeline, "firebase")
+# sqlite (default), firebase or offline; offline never touches Firebase, for load tests and CI
+preferences = open_preferences(os.getenv('PREFERENCES_BACKEND', 'sqlite'), database, metrics, PREFERENCES_DB)
+
+
+def open_models(paths):
+    models = ModelRegistry(paths, timeline)
+    # Predictions cached in event tables came from the old models
+    models.on_swap.append(event_tables.clear)
+    return models
+
+
+def make_batcher(models, name):
+    return InferenceBatcher(models, name, BATCH_WINDOW_MS / 1000, BATCH_MAX_ROWS, metrics)
+
+
+def observe_app_command(interaction, status):
+    started = interaction.extras.get('started')
+    if started is not None and interaction.command is not None:
+        metrics.observe("command_seconds", time.perf_counter() - started, command=interaction.command.qualified_name, status=status)
+
+
+class CommandTree(discord.app_commands.CommandTree):
+    async def interaction_check(self, interaction):
+        # Runs in the tree's own task as soon as the interaction arrives, before the command is looked
+        # up; an on_interaction listener is only scheduled after that task, so it would start late
+        interaction.extras['started'] = time.perf_counter()
+        return True
+
+    async def on_error(self, interaction, error):
+        observe_app_command(interaction, "error")
+        await super().on_error(interaction, error)
+
+
+class Bot(commands.Bot):
+    async def close(self):
+        if self.is_closed():
+            return await super().close()
+        # Stop taking commands first, then write out the warm cache and any unsynced preferences
+        await super().close()
+        for name, close in (("warm cache", warm_start.close), ("preferences", preferences.close), ("RobotEvents client", api.close)):
+            try:
+                await close()
+            except Exception as e:
+                print(f"Closing the {name} failed: {e}")
+
+
+def make_bot(**options):
+    intents = discord.Intents.default()
+    intents.message_content = True
+    bot = Bot(intents=intents, tree_cls=CommandTree, **options)
+    bot.add_listener(paginator.on_raw_reaction_add)
+
+    @bot.event
+    async def on_app_command_completion(interaction, command):
+        # Only fires on success; failures are recorded by CommandTree.on_error
+        observe_app_command(interaction, "ok")
+
+    @bot.before_invoke
+    async def start_command_timer(ctx):
+        ctx.started = time.perf_counter()
+
+    @bot.after_invoke
+    async def record_command_latency(ctx):
+        # Runs even when the command raised
+        metrics.observe("command_seconds", time.perf_counter() - ctx.started, command=ctx.command.qualified_name,
+                        status="error" if ctx.command_failed else "ok")
+
+    return bot
+
+
+async def warm_up(models, prefetcher):
+    # Firebase, the models and the warm cache only load once the gateway connection is up
+    names = ["warm cache", "preferences", *models.paths]
+    results = await asyncio.gather(warm_start.start(), preferences.start(), *models.warm(), return_exceptions=True)
+    for name, result in zip(names, results):
+        if isinstance(result, BaseException):
+            print(f"Warm-up of {name} failed: {result!r}")
+    # Registered teams are only known once preferences have loaded
+    prefetcher.start()
+    print(timeline.report())
+
+
+def start_background(models, prefetcher):
+    # on_ready fires again after every reconnect; everything here is safe to call repeatedly
+    if "gateway" not in timeline.phases:
+        timeline.mark("gateway")
+        asyncio.ensure_future(warm_up(models, prefetcher))
+    leaderboard.start()
+    models.watch()
+    metrics.start(METRICS_FILE, port=METRICS_PORT)
@@ -0,0 +1,132 @@
+import hashlib
+import os
+
+import numpy as np
+
+# Compiles the shipped scikit-learn models into flat NumPy arrays so the bot can predict without
+# unpickling sklearn estimators. Run this file after retraining to refresh the .npz files.
+MODEL_FILES = ['linear_regression_model.pkl', 'random_forest_model.pkl', 'gradient_boosting_model.pkl']
+
+
+def compile_model(model):
+    name = type(model).__name__
+    if name == 'LinearRegression':
+        return {
+            'kind': np.array('linear'),
+            'coef': np.asarray(model.coef_, dtype=np.float64).ravel(),
+            'intercept': np.array(float(np.ravel(model.intercept_)[0])),
+        }
+
+    if name == 'RandomForestRegressor':
+        trees = list(model.estimators_)
+        base = 0.0
+        scale = 1.0 / len(trees)
+    elif name == 'GradientBoostingRegressor':
+        trees = list(np.ravel(model.estimators_))
+        base = 0.0 if model.init_ == 'zero' else float(np.ravel(model.init_.constant_)[0])
+        scale = model.learning_rate
+    else:
+        raise TypeError(f"Can't compile a {name}")
+
+    # Every tree's nodes go into one set of arrays; child indices are shifted by the tree's offset
+    feature, threshold, left, right, value, roots = [], [], [], [], [], []
+    offset = 0
+    for estimator in trees:
+        tree = estimator.tree_
+        leaf = tree.children_left == -1
+        roots.append(offset)
+        feature.append(np.where(leaf, -1, tree.feature))
+        threshold.append(tree.threshold)
+        left.append(np.where(leaf, -1, tree.children_left + offset))
+        right.append(np.where(leaf, -1, tree.children_right + offset))
+        value.append(tree.value[:, 0, 0])
+        offset += tree.node_count
+    return {
+        'kind': np.array('trees'),
+        'feature': np.concatenate(feature).astype(np.int32),
+        'threshold': np.concatenate(threshold).astype(np.float64),
+        'left': np.concatenate(left).astype(np.int32),
+        'right': np.concatenate(right).astype(np.int32),
+        'value': np.concatenate(value).astype(np.float64),
+        'roots': np.array(roots, dtype=np.int32),
+        'base': np.array(base),
+        'scale': np.array(scale),
+    }
+
+
+class CompiledModel:
+    def __init__(self, arrays):
+        self.kind = str(arrays['kind'])
+        for key, array in arrays.items():
+            if key != 'kind':
+                setattr(self, key, np.asarray(array))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            return cls({key: arrays[key] for key in arrays.files})
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if self.kind == 'linear':
+            return X @ self.coef + self.intercept
+
+        # Walk all (sample, tree) pairs down one level per step until every one sits on a leaf.
+        # sklearn compares float32 inputs against the thresholds, so do the same to match its splits.
+        X = X.astype(np.float32)
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        while True:
+            feature = self.feature[node]
+            split = feature >= 0
+            if not split.any():
+                break
+            go_left = X[rows, np.where(split, feature, 0)] <= self.threshold[node]
+            node = np.where(split, np.where(go_left, self.left[node], self.right[node]), node)
+        return self.base + self.scale * self.value[node].sum(axis=1)
+
+
+def compiled_path(pkl_path):
+    return os.path.splitext(pkl_path)[0] + '.npz'
+
+
+def file_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def load_model(pkl_path):
+    # Prefer the compiled arrays, unless the pickle has been retrained since they were exported
+    npz_path = compiled_path(pkl_path)
+    if os.path.exists(npz_path):
+        compiled = CompiledModel.load(npz_path)
+        if str(compiled.source) == file_digest(pkl_path):
+            return compiled
+    import joblib
+    return joblib.load(pkl_path)
+
+
+def export(pkl_path, check_rows=None):
+    import joblib
+    model = joblib.load(pkl_path)
+    arrays = compile_model(model)
+    arrays['source'] = np.array(file_digest(pkl_path))
+    # Written under a temporary name and renamed, like the pickles train.py writes
+    temp = compiled_path(pkl_path) + '.tmp'
+    with open(temp, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(temp, compiled_path(pkl_path))
+    if check_rows is not None:
+        compiled = CompiledModel(arrays)
+        return float(np.max(np.abs(compiled.predict(check_rows) - model.predict(check_rows))))
+    return None
+
+
+if __name__ == '__main__':
+    import pandas as pd
+    from dataset import Dataset, FEATURES
+
+    check_rows = pd.DataFrame(Dataset().load(FEATURES))
+    for pkl_path in MODEL_FILES:
+        max_error = export(pkl_path, check_rows)
+        print(f"{pkl_path} -> {compiled_path(pkl_path)} (max difference from sklearn: {max_error:.3g})")
@@ -0,0 +1,172 @@
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+
+# Append-only columnar training set: every append becomes a new partition directory holding one
+# .npy file per column, so nothing already written is ever rewritten and columns can be memory-mapped
+SCHEMA = {
+    'Event_ID': np.int64,
+    'Match_Number': np.int32,
+    'Team_ID': np.int64,
+    'Average_AP': np.float64,
+    'Average_SP': np.float64,
+    'Average_Average_Points': np.float64,
+    'Winner': np.int8,
+}
+FEATURES = ['Average_AP', 'Average_SP', 'Average_Average_Points']
+KEY = ['Event_ID', 'Match_Number', 'Team_ID']
+# Rows imported from the old CSV don't know their event, so they can't be deduplicated
+UNKNOWN_EVENT = -1
+# Written into a merged partition by compact(); lists the partitions it replaces until they are gone
+REPLACES = 'replaces.json'
+# Bits given to each KEY column when packing a key into one int64
+KEY_BITS = (21, 18, 24)
+
+
+def pack_keys(event_ids, match_numbers, team_ids):
+    packed = np.zeros(len(event_ids), dtype=np.int64)
+    for name, values, bits in zip(KEY, (event_ids, match_numbers, team_ids), KEY_BITS):
+        values = np.asarray(values, dtype=np.int64)
+        if len(values) and (values.min() < 0 or values.max() >= 1 << bits):
+            raise ValueError(f"{name} outside 0..{(1 << bits) - 1} can't be packed into a row key")
+        packed = (packed << bits) | values
+    return packed
+
+
+class Dataset:
+    def __init__(self, root='training_data'):
+        self.root = root
+        self._keys = None
+        self._finish_compact()
+
+    def _part_dirs(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(os.path.join(self.root, name) for name in os.listdir(self.root) if name.startswith('part-'))
+
+    def _replaced(self):
+        # {merged partition: names of the partitions it replaces} for compactions not yet finished
+        replaced = {}
+        for part in self._part_dirs():
+            manifest = os.path.join(part, REPLACES)
+            if os.path.exists(manifest):
+                with open(manifest) as f:
+                    replaced[part] = json.load(f)
+        return replaced
+
+    def partitions(self):
+        # Partitions already merged by an interrupted compact() are hidden, so no row is read twice
+        hidden = {name for names in self._replaced().values() for name in names}
+        return [part for part in self._part_dirs() if os.path.basename(part) not in hidden]
+
+    def _part_columns(self, part, columns):
+        return {name: np.load(os.path.join(part, name + '.npy'), mmap_mode='r') for name in columns}
+
+    def load(self, columns=None):
+        # A single partition is returned as read-only memory maps with no copy; run compact() after
+        # several appends to get back to that
+        columns = list(columns or SCHEMA)
+        parts = [self._part_columns(part, columns) for part in self.partitions()]
+        if not parts:
+            return {name: np.empty(0, dtype=SCHEMA[name]) for name in columns}
+        if len(parts) == 1:
+            return parts[0]
+        return {name: np.concatenate([part[name] for part in parts]) for name in columns}
+
+    def __len__(self):
+        return sum(len(np.load(os.path.join(part, 'Winner.npy'), mmap_mode='r')) for part in self.partitions())
+
+    def _existing_keys(self):
+        # Sorted packed keys of every stored row with a known event. Read from disk once, then kept
+        # up to date by append(), so appending a batch never rescans what is already stored.
+        if self._keys is None:
+            keys = self.load(KEY)
+            known = keys['Event_ID'] != UNKNOWN_EVENT
+            self._keys = np.sort(pack_keys(*(keys[name][known] for name in KEY)))
+        return self._keys
+
+    def append(self, columns):
+        columns = {name: np.asarray(columns[name], dtype=dtype) for name, dtype in SCHEMA.items()}
+        if len(columns['Winner']) == 0:
+            return 0
+
+        # Drop rows whose (event, match, team) is already stored or repeats within this batch
+        existing = self._existing_keys()
+        known = np.flatnonzero(columns['Event_ID'] != UNKNOWN_EVENT)
+        packed = pack_keys(*(columns[name][known] for name in KEY))
+        new_keys, first = np.unique(packed, return_index=True)
+        fresh = ~np.isin(new_keys, existing, assume_unique=True)
+        keep = np.ones(len(columns['Winner']), dtype=bool)
+        keep[known] = False
+        keep[known[first[fresh]]] = True
+        if not keep.any():
+            return 0
+        self._write_partition({name: array[keep] for name, array in columns.items()})
+        new_keys = new_keys[fresh]
+        self._keys = np.insert(existing, np.searchsorted(existing, new_keys), new_keys)
+        return int(keep.sum())
+
+    def _write_partition(self, columns, replaces=None):
+        os.makedirs(self.root, exist_ok=True)
+        parts = self._part_dirs()
+        number = int(os.path.basename(parts[-1])[5:]) + 1 if parts else 0
+        final = os.path.join(self.root, f'part-{number:05d}')
+        # Written under a temporary name and renamed, so readers never see half a partition
+        temp = os.path.join(self.root, f'.tmp-{number:05d}')
+        shutil.rmtree(temp, ignore_errors=True)
+        os.makedirs(temp)
+        for name, array in columns.items():
+            np.save(os.path.join(temp, name + '.npy'), array)
+        if replaces is not None:
+            with open(os.path.join(temp, REPLACES), 'w') as f:
+                json.dump(replaces, f)
+        os.rename(temp, final)
+        return final
+
+    def compact(self):
+        # Merges every partition into one so loads are zero-copy again. The merged partition appears
+        # in one rename together with the list of partitions it replaces, and those are hidden from
+        # then on; a crash part way through is finished the next time the dataset is opened.
+        self._finish_compact()
+        parts = self.partitions()
+        if len(parts) < 2:
+            return
+        merged = self.load()
+        merged = {name: np.ascontiguousarray(array) for name, array in merged.items()}
+        self._write_partition(merged, replaces=[os.path.basename(part) for part in parts])
+        self._finish_compact()
+
+    def _finish_compact(self):
+        for merged, names in self._replaced().items():
+            for name in names:
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+            # Only dropped once every replaced partition is gone
+            os.remove(os.path.join(merged, REPLACES))
+            if not os.path.exists(os.path.join(self.root, 'part-00000')):
+                os.rename(merged, os.path.join(self.root, 'part-00000'))
+
+
+def import_csv(path, dataset):
+    import pandas as pd
+
+    data = pd.read_csv(path)
+    columns = {name: data[name].to_numpy() for name in SCHEMA if name in data}
+    if 'Event_ID' not in columns:
+        if len(dataset):
+            raise ValueError(f"{path} has no Event_ID column, so importing it into a non-empty dataset would duplicate rows")
+        columns['Event_ID'] = np.full(len(data), UNKNOWN_EVENT)
+    return dataset.append(columns)
+
+
+if __name__ == '__main__':
+    # python dataset.py training_data.csv, or python dataset.py compact
+    if sys.argv[1:] == ['compact']:
+        dataset = Dataset()
+        parts = len(dataset.partitions())
+        dataset.compact()
+        print(f"Compacted {parts} partitions holding {len(dataset)} rows")
+    else:
+        print(f"Imported {import_csv(sys.argv[1] if len(sys.argv) > 1 else 'training_data.csv', Dataset())} rows")
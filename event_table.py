@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+import numpy as np
+
+
+class EventMatchupTable:
+    # Every team at an event is predicted once per model, then the strength of every possible
+    # alliance (the mean of its two teams' predictions) comes from a single broadcast
+    def __init__(self, event_id, team_numbers, predictions):
+        self.event_id = event_id
+        self.index = {number.upper(): i for i, number in enumerate(team_numbers)}
+        predictions = np.asarray(predictions, dtype=np.float64)
+        self.alliances = (predictions[:, :, None] + predictions[:, None, :]) / 2
+        self.built_at = time.time()
+
+    def __contains__(self, team_number):
+        return team_number.upper() in self.index
+
+    def lookup(self, team_names):
+        # Per model [first alliance, second alliance] strengths for team1 & team2 vs team3 & team4
+        a, b, c, d = (self.index[team.upper()] for team in team_names)
+        return self.alliances[:, (a, c), (b, d)]
+
+    @classmethod
+    async def build(cls, event_id, client, feature_store, batchers, limit=8):
+        teams = [team async for team in client.paginate(f"/v2/events/{event_id}/teams")]
+        semaphore = asyncio.Semaphore(limit)
+
+        async def fetch(team):
+            async with semaphore:
+                return await feature_store.features(client, team['id'])
+
+        results = await asyncio.gather(*(fetch(team) for team in teams), return_exceptions=True)
+        # Teams whose data couldn't be fetched are left out; matchups with them fall back to the live path
+        numbers = []
+        rows = []
+        for team, result in zip(teams, results):
+            if not isinstance(result, BaseException):
+                numbers.append(team['number'])
+                rows.append([result['Average_AP'], result['Average_SP'], result['Average_Average_Points']])
+        if not rows:
+            raise LookupError(f"No team data found for event {event_id}")
+        predictions = await asyncio.gather(*(batcher.predict(rows) for batcher in batchers))
+        return cls(event_id, numbers, predictions), teams
+
+
+class EventTables:
+    def __init__(self, max_age=15 * 60):
+        self.max_age = max_age
+        self.tables = {}
+
+    def add(self, table):
+        self.tables[table.event_id] = table
+
+    def clear(self):
+        # Tables hold predictions, so they are dropped whenever a model is swapped out
+        self.tables.clear()
+
+    def lookup(self, team_names):
+        now = time.time()
+        for event_id, table in list(self.tables.items()):
+            # Rankings move during an event, so old tables are dropped rather than trusted
+            if now - table.built_at > self.max_age:
+                del self.tables[event_id]
+            elif all(team in table for team in team_names):
+                return table.lookup(team_names)
+        return None
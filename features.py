@@ -0,0 +1,75 @@
+import time
+
+FEATURE_NAMES = ['Average_AP', 'Average_SP', 'Average_Average_Points']
+
+
+class FeatureStore:
+    # Running AP/SP/average point sums per team. Refreshing a team only folds in ranking entries
+    # that are new or whose values changed, and lookups between refreshes are a dict hit.
+    def __init__(self, max_age=30 * 60):
+        self.max_age = max_age
+        self._teams = {}
+
+    def fold(self, team_id, entries):
+        team = self._teams.setdefault(team_id, {'sums': [0.0, 0.0, 0.0], 'entries': {}, 'refreshed_at': 0})
+        sums = team['sums']
+        folded = 0
+        for entry in entries:
+            if 'ap' not in entry or 'sp' not in entry or entry.get('average_points') is None:
+                continue
+            values = (entry['ap'], entry['sp'], entry['average_points'])
+            previous = team['entries'].get(entry['id'])
+            if previous == values:
+                continue
+            # Rankings at an event in progress keep their ID but change values, so swap the old ones out
+            if previous is not None:
+                for i in range(3):
+                    sums[i] -= previous[i]
+            for i in range(3):
+                sums[i] += values[i]
+            team['entries'][entry['id']] = values
+            folded += 1
+        team['refreshed_at'] = time.time()
+        return folded
+
+    def snapshot(self, team_id):
+        team = self._teams[team_id]
+        return {'entries': [[entry_id, *values] for entry_id, values in team['entries'].items()],
+                'refreshed_at': team['refreshed_at']}
+
+    def restore(self, team_id, snapshot):
+        # Rebuilds a team saved by snapshot(); it keeps its original refresh time, so is_fresh()
+        # still decides whether it needs fetching again. A team refreshed since startup is kept.
+        current = self._teams.get(team_id)
+        if current is not None and current['refreshed_at'] >= snapshot['refreshed_at']:
+            return False
+        entries = {entry_id: tuple(values) for entry_id, *values in snapshot['entries']}
+        sums = [sum(values[i] for values in entries.values()) for i in range(3)]
+        self._teams[team_id] = {'sums': sums, 'entries': entries, 'refreshed_at': snapshot['refreshed_at']}
+        return True
+
+    def refreshed_since(self, since):
+        return [team_id for team_id, team in self._teams.items() if team['refreshed_at'] > since]
+
+    def get(self, team_id):
+        team = self._teams.get(team_id)
+        if team is None:
+            return None
+        total_entries = len(team['entries'])
+        if total_entries == 0:
+            return dict.fromkeys(FEATURE_NAMES, 0)
+        return {name: total / total_entries for name, total in zip(FEATURE_NAMES, team['sums'])}
+
+    def is_fresh(self, team_id):
+        team = self._teams.get(team_id)
+        return team is not None and time.time() - team['refreshed_at'] < self.max_age
+
+    async def refresh(self, client, team_id):
+        entries = [entry async for entry in client.paginate(f"/v2/teams/{team_id}/rankings", cache=False)]
+        self.fold(team_id, entries)
+        return self.get(team_id)
+
+    async def features(self, client, team_id):
+        if self.is_fresh(team_id):
+            return self.get(team_id)
+        return await self.refresh(client, team_id)
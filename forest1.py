@@ -1,39 +1,15 @@
-import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_squared_error
 import numpy as np
 import matplotlib.pyplot as plt
 from linear2 import get_team_data
-import joblib
-from dotenv import load_dotenv
-import os
+from train import load_training_data, train_model
 
-# Load data into DataFrame
-load_dotenv()
-API_KEY = [os.getenv('API_KEY')] 
-data = pd.read_csv("training_data.csv")
-
-# Select features (Average_AP, Average_SP, Average_Average_Points) and target variable (Winner)
-X = data[['Average_AP', 'Average_SP', 'Average_Average_Points']]
-y = data['Winner']
-
-# Split data into training and testing sets
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.1, random_state=1)
+# Loading, splitting, training and saving are shared with train.py (which trains every model at
+# once); this script keeps the example prediction and plot
+X, y = load_training_data()
 
 # Train a Random Forest model
-model = RandomForestRegressor(n_estimators=100, random_state=42)
-model.fit(X_train, y_train)
-
-# Save the trained model
-joblib.dump(model, 'random_forest_model.pkl')
-
-# Make predictions
-y_pred = model.predict(X_test)
-
-# Calculate mean squared error
-mse = mean_squared_error(y_test, y_pred)
-print("Mean Squared Error:", mse)
+model, report = train_model('random_forest', X, y)
+print("Mean Squared Error:", report['mse'])
 
 # Example prediction for a new set of VEX team data
 team_data = [166511, 139407, 153257, 159215]
@@ -1,37 +1,15 @@
-import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import GradientBoostingRegressor
-from sklearn.metrics import mean_squared_error
 import numpy as np
 import matplotlib.pyplot as plt
-from linear2 import get_team_data  # Assuming you have defined this function
-import joblib
-from dotenv import load_dotenv
-import os
+from linear2 import get_team_data
+from train import load_training_data, train_model
 
-# Load data into DataFrame
-load_dotenv()
-API_KEY = [os.getenv('API_KEY')] 
-data = pd.read_csv("training_data.csv")
-
-# Select features (Average_AP, Average_SP, Average_Average_Points) and target variable (Winner)
-X = data[['Average_AP', 'Average_SP', 'Average_Average_Points']]
-y = data['Winner']
-
-# Split data into training and testing sets
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=1)
+# Loading, splitting, training and saving are shared with train.py (which trains every model at
+# once); this script keeps the example prediction and plot
+X, y = load_training_data()
 
 # Train a Gradient Boosting model
-model = GradientBoostingRegressor(n_estimators=100, learning_rate=0.1, random_state=1)
-model.fit(X_train, y_train)
-joblib.dump(model, 'gradient_boosting_model.pkl')
-
-# Make predictions
-y_pred = model.predict(X_test)
-
-# Calculate mean squared error
-mse = mean_squared_error(y_test, y_pred)
-print("Mean Squared Error:", mse)
+model, report = train_model('gradient_boosting', X, y)
+print("Mean Squared Error:", report['mse'])
 
 # Example prediction for a new set of VEX team data
 team_data = [166511, 139407, 153257, 159215]
@@ -40,11 +18,9 @@ for team in team_data:
     team_data_inv = get_team_data(team)
     new_team_data.append(team_data_inv)
 
-# Create DataFrame with feature names
-feature_names = ['Average_AP', 'Average_SP', 'Average_Average_Points']
-new_team_df = pd.DataFrame(new_team_data, columns=feature_names)
+reshaped_data = np.array([[sample['Average_AP'], sample['Average_SP'], sample['Average_Average_Points']] for sample in new_team_data])
 
-predicted_win_probability = model.predict(new_team_df)
+predicted_win_probability = model.predict(reshaped_data)
 
 # Aggregate probabilities for each alliance
 blue_alliance_prob = np.mean(predicted_win_probability[:2])
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import os
+import random as rand
+
+from dataset import Dataset
+
+COLUMNS = ['Event_ID', 'Match_Number', 'Team_ID', 'Average_AP', 'Average_SP', 'Average_Average_Points', 'Winner']
+
+
+class Harvester:
+    # Crawls events concurrently and appends each event's training rows to the dataset as soon as
+    # the event is done. Finished events are checkpointed, so rerunning after a crash picks up where
+    # it stopped, and the dataset drops any (event, match, team) rows it already holds.
+    def __init__(self, client, feature_store, dataset=None, checkpoint='harvest_checkpoint.json',
+                 concurrency=4, team_concurrency=16):
+        self.client = client
+        self.feature_store = feature_store
+        self.dataset = dataset if dataset is not None else Dataset()
+        self.checkpoint = checkpoint
+        self.events = asyncio.Semaphore(concurrency)
+        self.requests = asyncio.Semaphore(team_concurrency)
+        self._team_fetches = {}
+        self.done = self._load_checkpoint()
+
+    def _load_checkpoint(self):
+        if not os.path.exists(self.checkpoint):
+            return set()
+        with open(self.checkpoint) as f:
+            return set(json.load(f)['events'])
+
+    def _save_checkpoint(self):
+        temp = self.checkpoint + '.tmp'
+        with open(temp, 'w') as f:
+            json.dump({'events': sorted(self.done)}, f)
+        os.replace(temp, self.checkpoint)
+
+    async def team_features(self, team_id):
+        # One cache for the whole run, and concurrent events asking for the same team share a fetch
+        if self.feature_store.is_fresh(team_id):
+            return self.feature_store.get(team_id)
+        if team_id not in self._team_fetches:
+            self._team_fetches[team_id] = asyncio.ensure_future(self._fetch_team(team_id))
+        return await self._team_fetches[team_id]
+
+    async def _fetch_team(self, team_id):
+        try:
+            async with self.requests:
+                return await self.feature_store.refresh(self.client, team_id)
+        finally:
+            del self._team_fetches[team_id]
+
+    async def event_rows(self, event_id):
+        matches = [match async for match in self.client.paginate(f"/v2/events/{event_id}/divisions/1/matches")]
+        team_ids = {team['team']['id'] for match in matches for alliance in match['alliances'] for team in alliance['teams']}
+        features = dict(zip(team_ids, await asyncio.gather(*(self.team_features(team_id) for team_id in team_ids))))
+
+        rows = []
+        for i, match in enumerate(matches, start=1):
+            blue_teams = [team['team']['id'] for team in match['alliances'][0]['teams']]
+            red_teams = [team['team']['id'] for team in match['alliances'][1]['teams']]
+            blue_score = match['alliances'][0]['score']
+            red_score = match['alliances'][1]['score']
+            winner = 0 if blue_score > red_score else 1 if red_score > blue_score else rand.randint(0, 1)
+
+            for team_id in blue_teams + red_teams:
+                team_data = features[team_id]
+                won = (winner == 0 and team_id in blue_teams) or (winner == 1 and team_id in red_teams)
+                rows.append([event_id, i, team_id, team_data['Average_AP'], team_data['Average_SP'],
+                             team_data['Average_Average_Points'], 0 if won else 1])
+        return rows
+
+    def _write(self, rows):
+        return self.dataset.append({name: [row[i] for row in rows] for i, name in enumerate(COLUMNS)})
+
+    async def harvest_event(self, event_id):
+        async with self.events:
+            rows = await self.event_rows(event_id)
+        # Rows hit the disk before the event is checkpointed, so a crash can't lose a finished event
+        written = self._write(rows)
+        self.done.add(event_id)
+        self._save_checkpoint()
+        print(f"Event {event_id}: {written} new rows")
+
+    async def run(self, event_ids):
+        pending = [event_id for event_id in event_ids if event_id not in self.done]
+        results = await asyncio.gather(*(self.harvest_event(event_id) for event_id in pending), return_exceptions=True)
+        for event_id, result in zip(pending, results):
+            if isinstance(result, BaseException):
+                print(f"Event {event_id} failed and will be retried on the next run: {result}")
+        # Every event was appended as its own partition; merge them so training loads are zero-copy again
+        await asyncio.to_thread(self.dataset.compact)
@@ -0,0 +1,158 @@
+import asyncio
+import os
+import time
+
+import numpy as np
+
+from compiled_models import compiled_path, load_model
+from startup import Deferred
+
+
+# A few plausible feature rows every newly loaded model must handle before it is swapped in
+SMOKE_ROWS = np.array([[0.0, 0.0, 0.0], [5.0, 20.0, 30.0], [12.0, 60.0, 75.0], [25.0, 150.0, 140.0]])
+
+
+def artifact_signature(path):
+    # Changes whenever the pickle or its compiled arrays are replaced
+    return tuple(
+        (os.stat(file).st_mtime_ns, os.stat(file).st_size) if os.path.exists(file) else None
+        for file in (path, compiled_path(path))
+    )
+
+
+def load_checked(path):
+    model = load_model(path)
+    predictions = np.asarray(model.predict(SMOKE_ROWS), dtype=float)
+    if predictions.shape != (len(SMOKE_ROWS),) or not np.isfinite(predictions).all():
+        raise ValueError(f"{path} failed the smoke test: {predictions!r}")
+    return model
+
+
+class ModelRegistry:
+    # Model files are loaded in worker threads, either warmed in the background after the bot
+    # connects or on the first prediction that needs them. A replaced artifact is loaded and smoke
+    # tested in the background, then swapped in; batches already running finish on the old model.
+    def __init__(self, paths, timeline=None, interval=30):
+        self.paths = paths
+        self.interval = interval
+        self.signatures = {}
+        self._models = {
+            name: Deferred(lambda name=name: self._load(name), timeline, f"load {path}")
+            for name, path in paths.items()
+        }
+        self._live = {}
+        self._reload_lock = asyncio.Lock()
+        self._watch_task = None
+        self.on_swap = []
+
+    def _load(self, name):
+        signature = artifact_signature(self.paths[name])
+        model = load_checked(self.paths[name])
+        self.signatures[name] = signature
+        return model
+
+    def warm(self):
+        return [model.start() for model in self._models.values()]
+
+    async def get(self, name):
+        if name in self._live:
+            return self._live[name]
+        return await self._models[name].get()
+
+    async def reload(self, names=None):
+        # Returns {name: None on success or the error that kept the old model in place}
+        results = {}
+        async with self._reload_lock:
+            for name in names or self.paths:
+                try:
+                    model = await asyncio.to_thread(self._load, name)
+                except Exception as e:
+                    # Remember the rejected files so the watcher doesn't retry them every poll
+                    self.signatures[name] = artifact_signature(self.paths[name])
+                    results[name] = e
+                    continue
+                self._live[name] = model
+                results[name] = None
+            if any(error is None for error in results.values()):
+                for callback in self.on_swap:
+                    callback()
+        return results
+
+    def changed(self):
+        return [name for name, path in self.paths.items()
+                if name in self.signatures and artifact_signature(path) != self.signatures[name]]
+
+    async def _watch_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                names = self.changed()
+                if names:
+                    for name, error in (await self.reload(names)).items():
+                        print(f"Reloaded {name}" if error is None else f"Keeping the current {name} model: {error}")
+            except Exception as e:
+                print(f"Model artifact check failed: {e}")
+
+    def watch(self):
+        # Polls the artifact files; safe to call again on every reconnect
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.ensure_future(self._watch_loop())
+        return self._watch_task
+
+
+class InferenceBatcher:
+    # Collects feature rows from concurrent commands for a short window, runs one predict call for
+    # the whole batch, then hands every caller back its own slice of the results
+    def __init__(self, models, name, window=0.005, max_rows=256, metrics=None):
+        self.models = models
+        self.metrics = metrics
+        self.name = name
+        self.window = window
+        self.max_rows = max_rows
+        self._pending = []
+        self._pending_rows = 0
+        self._timer = None
+        self._tasks = set()
+
+    async def predict(self, rows):
+        loop = asyncio.get_running_loop()
+        rows = np.asarray(rows, dtype=float)
+        future = loop.create_future()
+        self._pending.append((rows, future))
+        self._pending_rows += len(rows)
+        if self._pending_rows >= self.max_rows:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._pending_rows = self._pending, [], 0
+        if batch:
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        try:
+            model = await self.models.get(self.name)
+            rows = np.concatenate([rows for rows, _ in batch])
+            start = time.perf_counter()
+            predictions = await asyncio.to_thread(model.predict, rows)
+            if self.metrics is not None:
+                self.metrics.observe("inference_seconds", time.perf_counter() - start, model=self.name)
+                self.metrics.inc("inference_rows_total", len(rows), model=self.name)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        offset = 0
+        for rows, future in batch:
+            # The command may have been cancelled while it waited
+            if not future.done():
+                future.set_result(predictions[offset:offset + len(rows)])
+            offset += len(rows)
@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    def __init__(self, key, capacity, rate):
+        self.key = key
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0
+
+    def available(self, now):
+        if now < self.blocked_until:
+            return 0
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return self.tokens
+
+    def wait_time(self, now):
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        return max(0, (1 - self.available(now)) / self.rate)
+
+
+class KeyPool:
+    # A token bucket per API key. Each request goes to whichever key has the most budget left, and
+    # the buckets are corrected from the rate limit headers and 429 responses RobotEvents sends back.
+    def __init__(self, keys, capacity=60, rate=1.0):
+        self.buckets = {key: TokenBucket(key, capacity, rate) for key in keys if key}
+        if not self.buckets:
+            raise ValueError("KeyPool needs at least one API key")
+
+    def __len__(self):
+        return len(self.buckets)
+
+    def capacity(self):
+        return sum(bucket.capacity for bucket in self.buckets.values())
+
+    def budget(self):
+        now = time.monotonic()
+        return sum(bucket.available(now) for bucket in self.buckets.values())
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            bucket = max(self.buckets.values(), key=lambda bucket: bucket.available(now))
+            if bucket.tokens >= 1 and now >= bucket.blocked_until:
+                bucket.tokens -= 1
+                return bucket.key
+            await asyncio.sleep(min(bucket.wait_time(now) for bucket in self.buckets.values()))
+
+    def update(self, key, status, headers):
+        bucket = self.buckets[key]
+        limit = headers.get('X-RateLimit-Limit')
+        remaining = headers.get('X-RateLimit-Remaining')
+        if limit is not None and limit.isdigit() and int(limit) > 0:
+            # The limit is per minute, so the advertised limit replaces the default refill rate
+            bucket.capacity = int(limit)
+            bucket.rate = int(limit) / 60
+        if remaining is not None and remaining.isdigit():
+            bucket.tokens = min(bucket.tokens, int(remaining))
+        if status == 429:
+            retry_after = headers.get('Retry-After')
+            delay = float(retry_after) if retry_after and retry_after.replace('.', '', 1).isdigit() else 60
+            bucket.blocked_until = time.monotonic() + delay
+            bucket.tokens = 0
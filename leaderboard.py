@@ -0,0 +1,57 @@
+import asyncio
+import time
+
+
+class SkillsLeaderboard:
+    # In-memory snapshot of a season's skills standings, refreshed in the background
+    def __init__(self, client, season=181, interval=10 * 60):
+        self.client = client
+        self.season = season
+        self.interval = interval
+        self.entries = None
+        self.by_team = {}
+        self.updated_at = None
+        self._lock = asyncio.Lock()
+        self._task = None
+
+    async def _fetch(self):
+        data = await self.client.get(f"/seasons/{self.season}/skills?", cache=False)
+        # Hash index from team number to (rank, entry) so single team lookups don't scan the list
+        by_team = {}
+        for rank, item in enumerate(data, start=1):
+            by_team.setdefault(item['team']['team'].upper(), (rank, item))
+        self.entries = data
+        self.by_team = by_team
+        self.updated_at = time.time()
+
+    async def refresh(self):
+        async with self._lock:
+            await self._fetch()
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"Skills leaderboard refresh failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        # on_ready fires again after reconnects, so only one refresh loop is ever started
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def ensure_loaded(self):
+        # Only the very first command before the background loop has finished waits on the network
+        if self.entries is None:
+            async with self._lock:
+                if self.entries is None:
+                    await self._fetch()
+
+    async def rank(self, team_number):
+        await self.ensure_loaded()
+        return self.by_team.get(team_number.upper())
+
+    async def top(self, count=10):
+        await self.ensure_loaded()
+        return self.entries[:count]
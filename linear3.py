@@ -1,37 +1,15 @@
-import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import mean_squared_error
 import numpy as np
 import matplotlib.pyplot as plt
 from linear2 import get_team_data
-import joblib
-from dotenv import load_dotenv
-import os
-# Load data into DataFrame
-load_dotenv()
+from train import load_training_data, train_model
 
-API_KEY = [os.getenv('API_KEY')] 
-data = pd.read_csv("training_data.csv")
-
-# Select features (Average_AP, Average_SP, Average_Average_Points) and target variable (Winner)
-X = data[['Average_AP', 'Average_SP', 'Average_Average_Points']]
-y = data['Winner']
-
-# Split data into training and testing sets
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=1)
+# Loading, splitting, training and saving are shared with train.py (which trains every model at
+# once); this script keeps the example prediction and plot
+X, y = load_training_data()
 
 # Train a linear regression model
-model = LinearRegression()
-model.fit(X_train, y_train)
-joblib.dump(model, 'linear_regression_model.pkl')
-
-# Make predictions
-y_pred = model.predict(X_test)
-
-# Calculate mean squared error
-mse = mean_squared_error(y_test, y_pred)
-print("Mean Squared Error:", mse)
+model, report = train_model('linear', X, y)
+print("Mean Squared Error:", report['mse'])
 
 # Example prediction for a new set of VEX team data
 team_data = [166511, 139407, 153257, 159215]
@@ -1,259 +1,77 @@
-import requests
+from startup import timeline
 import discord
-from discord.ext import commands
 from typing import Final
 import os
-from dotenv import load_dotenv
 import re
 import asyncio
-import firebase_admin
-from firebase_admin import credentials
-from firebase_admin import db
-from test import *
 import numpy as np
-import joblib
+from bootstrap import (api, metrics, team_index, leaderboard, feature_store, event_tables, preferences, paginator,
+                       open_models, make_batcher, make_bot, start_background)
+from prefetch import Prefetcher
+from pipeline import gather_team_features, format_errors
+from winrates import WinLossTally
+from event_table import EventMatchupTable
+timeline.mark("imports")
 
-def get_team_data(team_id):
-    headers = {
-        "accept": "application/json",
-        "Authorization": f"Bearer {APITOKEN}",
-    }
-    search_url = f"https://www.robotevents.com/api/v2/teams/{team_id}/rankings"
-    response = requests.get(search_url, headers=headers)
-    response.raise_for_status()
-    team_data = response.json()['data']
+async def get_team_data(team_id):
+    return await feature_store.features(api, team_id)
 
-    # Initialize variables to store data
-    total_ap = 0
-    total_sp = 0
-    total_average_points = 0
-    total_entries = 0
-
-    # Calculate total AP, SP, and average points
-    for entry in team_data:
-        if 'ap' in entry and 'sp' in entry and entry.get('average_points') is not None:
-            total_ap += entry['ap']
-            total_sp += entry['sp']
-            total_average_points += entry['average_points']
-            total_entries += 1
-
-    # Calculate averages
-    average_ap = total_ap / total_entries if total_entries > 0 else 0
-    average_sp = total_sp / total_entries if total_entries > 0 else 0
-    average_average_points = total_average_points / total_entries if total_entries > 0 else 0
-
-    return {'Average_AP': average_ap, 'Average_SP': average_sp, 'Average_Average_Points': average_average_points}
-
-
-model = joblib.load('linear_regression_model.pkl')
-load_dotenv()
 TOKEN: Final[str] = os.getenv('DISCORD_TOKEN')
-APITOKEN: Final[str] = os.getenv('API_KEY')
-
-DatabaseURL: Final[str] = os.getenv('DB_URL')
-cred = credentials.Certificate(KEY)
-databaseApp = firebase_admin.initialize_app(cred, {
-    'databaseURL' : DatabaseURL
-})
-intents = discord.Intents.default()
-intents.message_content = True
-bot = commands.Bot(command_prefix=".",intents=intents)
-
-def get_team_id(team_number):
-    headers = {
-    "accept": "application/json",
-    "Authorization": f"Bearer {APITOKEN}",
-    }
-    search_url = f"https://www.robotevents.com/api/v2/teams?number%5B%5D={team_number}&myTeams=false"
-    response = requests.get(search_url, headers=headers)
-    response.raise_for_status()
-    data = response.json()
-    if data and data["data"]:
-        return data["data"][0]["id"]
-    else:
-        return None
-
-def calculate_overall_win_rate(data, team_name):
-    wins = 0
-    losses = 0
-    
-    for match in data:
-        for alliance in match['alliances']:
-            for team_data in alliance['teams']:
-                if team_data['team']['name'] == team_name:
-                    team_score = alliance['score']
-                    opponent_score = match['alliances'][1 if alliance['color'] == 'blue' else 0]['score']
-                    if team_score > opponent_score:
-                        wins += 1
-                    else:
-                        losses += 1
-        
-    total_matches = wins + losses
-    if total_matches > 0:
-        overall_win_rate = round((wins / total_matches) * 100, 2)
-    else:
-        overall_win_rate = None
-    
-    return {'wins': wins, 'losses': losses, 'win_rate': overall_win_rate}
-
-def calculate_event_win_rates(data, team_name):
-    win_rates = {}
-    
-    for match in data:
-        event_name = match['event']['name']
-        wins = 0
-        losses = 0
-        found_team = False
-        
-        for alliance in match['alliances']:
-            for team_data in alliance['teams']:
-                if team_data['team']['name'] == team_name:
-                    found_team = True
-                    team_score = alliance['score']
-                    opponent_score = match['alliances'][1 if alliance['color'] == 'blue' else 0]['score']
-                    
-                    if team_score > opponent_score:
-                        wins += 1
-                    else:
-                        losses += 1
-        
-        if found_team:
-            if event_name not in win_rates:
-                win_rates[event_name] = {'wins': 0, 'losses': 0}
-            
-            win_rates[event_name]['wins'] += wins
-            win_rates[event_name]['losses'] += losses
-    
-    # Calculate win rates for each event
-    for event_name, stats in win_rates.items():
-        total_matches = stats['wins'] + stats['losses']
-        if total_matches > 0:
-            win_rate = round((stats['wins'] / total_matches) * 100, 2)
-            win_rates[event_name]['win_rate'] = win_rate
-    
-    return win_rates
-
-async def remove_reactions(message):
-    await asyncio.sleep(60)  # Set timeout to 60 seconds
-    try:
-        await message.clear_reactions()
-    except discord.Forbidden:
-        pass
+models = open_models({'linear': 'linear_regression_model.pkl'})
+batcher = make_batcher(models, 'linear')
+prefetcher = Prefetcher(api, preferences, team_index, feature_store)
+bot = make_bot(command_prefix=".")
+
+async def get_team_id(team_number):
+    return await team_index.resolve(api, team_number)
+
+def winloss_pages(team_name, overall_win_rate, event_win_rates):
+    # Every page is built once up front; paging just swaps which embed the message shows
+    pages = []
+    sections = [("Overall", overall_win_rate)] + list(event_win_rates.items())
+    for page, (name, record) in enumerate(sections):
+        embed = discord.Embed(title=f"Win-Loss Record for {team_name}")
+        wins = record['wins']
+        losses = record['losses']
+        ties = record['ties']
+        win_rate_percentage = record['win_rate']
+        embed.color = discord.Color.green() if win_rate_percentage > 50 else discord.Color.red() if win_rate_percentage < 50 else discord.Color.gold()
+        embed.add_field(name=name, value=f"Wins: {wins}\nLosses: {losses}\nTies: {ties}\nWin Rate: {win_rate_percentage:.2f}%", inline=False)
+        embed.set_footer(text=f"Page {page + 1}/{len(sections)}")
+        pages.append(embed)
+    return pages
 
 @bot.tree.command(name='winloss', description='Shows the Win Loss rates of a team at every event')
 async def winloss(interaction: discord.Interaction, team: str):
     try:
-        headers = {
-            "accept": "application/json",
-            "Authorization": f"Bearer {APITOKEN}",
-        }
         team_name = team.upper()
-        team_id = get_team_id(team_name)
-        winLossUrl = f"https://www.robotevents.com/api/v2/teams/{team_id}/matches?season%5B%5D=181&per_page=250"
-        response = requests.get(winLossUrl, headers=headers)
-        data = response.json()['data']
+        team_id = await get_team_id(team_name)
+        tally = WinLossTally(team_id)
+        async for match in api.paginate(f"/v2/teams/{team_id}/matches?season%5B%5D=181"):
+            tally.add(match)
         
-        overall_win_rate = calculate_overall_win_rate(data, team_name)
-        event_win_rates = calculate_event_win_rates(data, team_name)
+        overall_win_rate, event_win_rates = tally.team_summary()
         
         if not overall_win_rate or not event_win_rates:
             await interaction.response.send_message(f"No win-loss data found for team {team_name}.")
             return
         
-        # Create embed with overall win rate
-        embed = discord.Embed(title=f"Win-Loss Record for {team_name}")
-        wins = overall_win_rate['wins']
-        losses = overall_win_rate['losses']
-        win_rate_percentage = overall_win_rate['win_rate']
-        color = discord.Color.green() if win_rate_percentage > 50 else discord.Color.red() if win_rate_percentage < 50 else discord.Color.gold()
-        embed.add_field(name="Overall", value=f"Wins: {wins}\nLosses: {losses}\nWin Rate: {win_rate_percentage:.2f}%", inline=False)
-        embed.color = color
-        await interaction.response.send_message(embed=embed) 
+        pages = winloss_pages(team_name, overall_win_rate, event_win_rates)
+        await interaction.response.send_message(embed=pages[0])
         message = await interaction.original_response()
-        
-        # Add reaction buttons for navigation if there are events
-        event_names = list(event_win_rates.keys())
-        if len(event_names) > 0:
-            await message.add_reaction("⬅️")
-            await message.add_reaction("➡️")
-        
-        async def update_embed(page):
-            embed.clear_fields()
-            if page == 0:
-                # Display overall win rate
-                if overall_win_rate:
-                    wins = overall_win_rate['wins']
-                    losses = overall_win_rate['losses']
-                    win_rate_percentage = overall_win_rate['win_rate']
-                    color = discord.Color.green() if win_rate_percentage > 50 else discord.Color.red() if win_rate_percentage < 50 else discord.Color.gold()
-                    embed.add_field(name="Overall", value=f"Wins: {wins}\nLosses: {losses}\nWin Rate: {win_rate_percentage:.2f}%", inline=False)
-                    embed.color = color
-                else:
-                    embed.add_field(name="Overall", value="No overall win-loss data found.", inline=False)
-            else:
-                # Display win rates for events
-                event_name = event_names[page - 1]
-                if event_name in event_win_rates:
-                    wins = event_win_rates[event_name]['wins']
-                    losses = event_win_rates[event_name]['losses']
-                    win_rate_percentage = event_win_rates[event_name]['win_rate']
-                    color = discord.Color.green() if win_rate_percentage > 50 else discord.Color.red() if win_rate_percentage < 50 else discord.Color.gold()
-                    embed.add_field(name=event_name, value=f"Wins: {wins}\nLosses: {losses}\nWin Rate: {win_rate_percentage:.2f}%", inline=False)
-                    embed.color = color
-                else:
-                    embed.add_field(name=event_name, value="No win-loss data found for this event.", inline=False)
-            
-            embed.set_footer(text=f"Page {page + 1}/{len(event_names) + 1}")
-            await message.edit(embed=embed)
-                
-        page = 0
-        await update_embed(page)
-        
-        # Start the timer to remove reactions after timeout
-        task = asyncio.create_task(remove_reactions(message))
-        
-        # Reaction handling loop
-        while True:
-            try:
-                reaction, user = await bot.wait_for("reaction_add", timeout=60, check=lambda reaction, user: user == interaction.user and reaction.message.id == message.id)
-                if str(reaction.emoji) == "➡️":
-                    page = (page + 1) % (len(event_names) + 1)
-                    await update_embed(page)
-                    # Reset the timer
-                    task.cancel()
-                    task = asyncio.create_task(remove_reactions(message))
-                elif str(reaction.emoji) == "⬅️":
-                    page = (page - 1) % (len(event_names) + 1)
-                    await update_embed(page)
-                    # Reset the timer
-                    task.cancel()
-                    task = asyncio.create_task(remove_reactions(message))
-                await message.remove_reaction(reaction, user)
-            except asyncio.TimeoutError:
-                break  # Exit the loop after timeout
-
-        # Cancel the task if it's still running
-        task.cancel()
+        # Reactions are handled by the shared paginator, so the command returns straight away
+        await paginator.send(message, pages, interaction.user.id)
 
     except Exception as e:
         await interaction.response.send_message(str(e))
 
 
 # Function to fetch events and rankings for a team
-def get_events_and_rankings(team_id):
-    headers = {
-    "accept": "application/json",
-    "Authorization": f"Bearer {APITOKEN}",
-    }
-    events_url = f"https://www.robotevents.com/api/v2/teams/{team_id}/rankings?season%5B%5D=181&season%5B%5D=182&season%5B%5D=180"
-    response = requests.get(events_url, headers=headers)
-    response.raise_for_status()
-    events_data = response.json()
-
-    awards_url = f"https://www.robotevents.com/api/v2/teams/{team_id}/awards?season%5B%5D=181&season%5B%5D=182&season%5B%5D=180"
-    response = requests.get(awards_url, headers=headers)
-    response.raise_for_status()
-    awards_data = response.json()
+async def get_events_and_rankings(team_id):
+    events_data, awards_data = await asyncio.gather(
+        api.get(f"/v2/teams/{team_id}/rankings?season%5B%5D=181&season%5B%5D=182&season%5B%5D=180"),
+        api.get(f"/v2/teams/{team_id}/awards?season%5B%5D=181&season%5B%5D=182&season%5B%5D=180"),
+    )
 
     return events_data, awards_data
 #Command to Shows that win loss record of a team, or if there is an event, the scores at that event
@@ -262,9 +80,9 @@ def get_events_and_rankings(team_id):
 @bot.tree.command(name='events', description='Finds events and awards for a team')
 async def events(interaction: discord.Interaction, team:str):
     try:
-        team_id = get_team_id(team)
+        team_id = await get_team_id(team)
         if team_id:
-            events_data, awards_data = get_events_and_rankings(team_id)
+            events_data, awards_data = await get_events_and_rankings(team_id)
             if events_data["data"]:
                 embed = discord.Embed(title=f"Events and Awards for Team {team}", color=0x00ff00)
                 for event in events_data["data"]:
@@ -302,27 +120,28 @@ async def events(interaction: discord.Interaction, team:str):
         await interaction.response.send_message(f"An error occurred: {e}")
 
 def format_rankings(data, team_number=None):
+    # data is the (rank, entry) pair for team_number, or the top entries when no team is given
     if team_number:
-        for idx, item in enumerate(data, start=1):
-            if item['team']['team'] == team_number:
-                team_name = item['team']['teamName']
-                score = item['scores']['score']
-                programming_score = item['scores']['programming']
-                driver_score = item['scores']['driver']
-                
-                embed = discord.Embed(title=f"Ranking for Team {team_number}", color=0xffd700)  # Gold color
-                embed.add_field(name=f"Team Name: {team_name}",
-                                value=f"**Total Score:** {score}\n"
-                                      f"**Driver Score:** {driver_score}\n"
-                                      f"**Autonomous Score:** {programming_score}\n"
-                                      f"**Ranking Place:** {idx}{'st' if idx == 1 else 'nd' if idx == 2 else 'rd' if idx == 3 else 'th'}",
-                                inline=False)
-                return embed
+        if data:
+            idx, item = data
+            team_name = item['team']['teamName']
+            score = item['scores']['score']
+            programming_score = item['scores']['programming']
+            driver_score = item['scores']['driver']
+            
+            embed = discord.Embed(title=f"Ranking for Team {team_number}", color=0xffd700)  # Gold color
+            embed.add_field(name=f"Team Name: {team_name}",
+                            value=f"**Total Score:** {score}\n"
+                                  f"**Driver Score:** {driver_score}\n"
+                                  f"**Autonomous Score:** {programming_score}\n"
+                                  f"**Ranking Place:** {idx}{'st' if idx == 1 else 'nd' if idx == 2 else 'rd' if idx == 3 else 'th'}",
+                            inline=False)
+            return embed
         return discord.Embed(title="Error", description=f"Team {team_number} not found.", color=0xff0000)  # Red color
 
     else:
         embed = discord.Embed(title="Top 10 Rankings", color=0xffd700)  # Gold color
-        for idx, item in enumerate(data[:10], start=1):
+        for idx, item in enumerate(data, start=1):
             team_name = item['team']['teamName']
             score = item['scores']['score']
             programming_score = item['scores']['programming']
@@ -354,29 +173,15 @@ def format_data(data):
 @bot.tree.command(name = 'ranking', description= 'Gives the top 10 skills rankings or a specified teams ranking.')
 async def rankings(interaction: discord.Interaction, team : str = ''):
     team_number = team if team else None  # Extract team number from args if present
-    searchurl = f"https://www.robotevents.com/api/seasons/181/skills?"
-    headers = {
-    "accept": "application/json",
-    "Authorization": f"Bearer {APITOKEN}",
-    }
-    response = requests.get(searchurl, headers=headers)
-    response.raise_for_status()
-    data = response.json()          
+    data = await leaderboard.rank(team_number) if team_number else await leaderboard.top(10)
     embed = format_rankings(data, team_number)  # Pass team_number to the format_rankings function
     await interaction.response.send_message(embed=embed)
 
 @bot.tree.command(name='info', description='Gives info on Vex Robotics Teams')
 async def info(interaction: discord.Interaction, team: str = ''):
-    team = team if team else db.reference(f"{interaction.user.id}/Team").get()
+    team = team if team else await preferences.get(interaction.user.id)
     try:
-        searchurl = f"https://www.robotevents.com/api/v2/teams?number%5B%5D={team}&myTeams=false"
-        headers = {
-        "accept": "application/json",
-        "Authorization": f"Bearer {APITOKEN}",
-        }
-        response = requests.get(searchurl, headers=headers)
-        response.raise_for_status()
-        data = response.json()          
+        data = await api.get(f"/v2/teams?number%5B%5D={team}&myTeams=false")
         embed = format_data(data["data"])
         await interaction.response.send_message(embed=embed)
     except Exception as e:
@@ -386,6 +191,7 @@ async def info(interaction: discord.Interaction, team: str = ''):
 @bot.event
 async def on_ready():
     print("Bot is up")
+    start_background(models, prefetcher)
     try:
         await bot.tree.sync()
         print("synced")
@@ -397,6 +203,13 @@ async def on_message(message):
     await bot.process_commands(message)
     print(message.content)
 
+@bot.tree.command(name='stats', description='Owner only')
+async def stats(interaction: discord.Interaction):
+    if interaction.user.id == 485477939845005312:
+        await interaction.response.send_message(f"```\n{metrics.report()[:1900]}\n```")
+    else:
+        await interaction.response.send_message('You must be the owner to use this command!')
+
 @bot.tree.command(name='sync', description='Owner only')
 async def sync(interaction: discord.Interaction):
     if interaction.user.id == 485477939845005312:
@@ -405,6 +218,26 @@ async def sync(interaction: discord.Interaction):
     else:
         await interaction.response.send_message('You must be the owner to use this command!')
 
+@bot.tree.command(name='reloadmodels', description='Owner only')
+async def reloadmodels(interaction: discord.Interaction):
+    if interaction.user.id == 485477939845005312:
+        await interaction.response.defer()
+        # The current models keep serving until each new one has loaded and passed its smoke test
+        results = await models.reload()
+        lines = [f"{name}: reloaded" if error is None else f"{name}: kept current model ({error})" for name, error in results.items()]
+        await interaction.followup.send("\n".join(lines))
+    else:
+        await interaction.response.send_message('You must be the owner to use this command!')
+
+@bot.tree.command(name='indexteams', description='Owner only')
+async def indexteams(interaction: discord.Interaction, program: int = 1):
+    if interaction.user.id == 485477939845005312:
+        await interaction.response.defer()
+        count = await team_index.populate(api, program)
+        await interaction.followup.send(f'Indexed {count} teams for program {program}.')
+    else:
+        await interaction.response.send_message('You must be the owner to use this command!')
+
 @bot.tree.command(name='help', description='Returns Usable Commands')
 async def help(interaction: discord.Interaction):
     embed = discord.Embed(title="Bot Commands", description="List of available commands", color=0x00ff00)
@@ -430,27 +263,21 @@ async def resources(interaction: discord.Interaction):
 async def matchup(interaction: discord.Interaction, team1: str, team2: str, team3: str, team4: str):
     try:
         # Fetch data for the provided team numbers
-        team_ids = []
-        team_names = []
-        team_data = [team1, team2, team3, team4]
-        for team in team_data:
-            team_ids.append(get_team_id(team))
-            team_names.append(team)
+        team_names = [team1, team2, team3, team4]
+        # A precomputed event table answers without fetching or predicting anything
+        alliance_probs = event_tables.lookup(team_names)
+        if alliance_probs is None:
+            new_team_data, errors = await gather_team_features(team_names, get_team_id, get_team_data)
+            if errors:
+                await interaction.response.send_message(f"Could not get data for:\n{format_errors(errors)}")
+                return
             
-        
-        new_team_data = []
-        for team in team_ids:
-            team_data_inv = get_team_data(team)
-            result = [team_data_inv['Average_AP'], team_data_inv['Average_SP'], team_data_inv['Average_Average_Points']]
-            new_team_data.append(result)
+            # Predict win probabilities using the linear regression model
+            predicted_win_probability = await batcher.predict(new_team_data)
             
-        
-        # Predict win probabilities using the linear regression model
-        predicted_win_probability = model.predict(new_team_data)
-        
-        # Aggregate probabilities for each alliance
-        blue_alliance_prob = np.mean(predicted_win_probability[:2])
-        red_alliance_prob = np.mean(predicted_win_probability[2:])
+            # Aggregate probabilities for each alliance
+            alliance_probs = [[np.mean(predicted_win_probability[:2]), np.mean(predicted_win_probability[2:])]]
+        blue_alliance_prob, red_alliance_prob = alliance_probs[0]
         
         # Normalize probabilities
         total_prob = blue_alliance_prob + red_alliance_prob
@@ -475,24 +302,29 @@ async def matchup(interaction: discord.Interaction, team1: str, team2: str, team
     
     except Exception as e:
         await interaction.response.send_message(f"An error occurred: {e}")
+@bot.tree.command(name='eventtable', description='Precomputes matchup odds for every team at an event')
+async def eventtable(interaction: discord.Interaction, event_id: int):
+    try:
+        await interaction.response.defer()
+        table, teams = await EventMatchupTable.build(event_id, api, feature_store, [batcher])
+        team_index.store(teams)
+        event_tables.add(table)
+        await interaction.followup.send(f"Matchups for {len(table.index)} teams at event {event_id} are ready.")
+    except Exception as e:
+        await interaction.followup.send(f"An error occurred: {e}")
 @bot.tree.command(name='setteam', description='Sets your team name. Uses this team as default for commands')
 async def setteam(interaction: discord.Interaction, team:str):
     Team = team
     user = interaction.user.id
-    ref = db.reference(f"/")
-    ref.update({
-        user: {
-            "Team": str(Team)
-        }
-    }
-    )
+    await preferences.set(user, Team)
     await interaction.response.send_message(f"You are now part of team {Team}")
 @bot.tree.command(name='myteam', description='Shows which team you have set')
 async def myteam(interaction: discord.Interaction):
     try:
-        Team  = db.reference(f"{interaction.user.id}/Team").get()
+        Team  = await preferences.get(interaction.user.id)
         await interaction.response.send_message(f"You are part of team {Team}")
     except:
         await interaction.response.send_message("You have not given a Team previously!")
 
+timeline.mark("setup")
 bot.run(TOKEN)
\ No newline at end of file
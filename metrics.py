@@ -0,0 +1,203 @@
+import asyncio
+import os
+import re
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds in seconds, from a cached lookup up to a slow paginated crawl
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation, which is all a histogram can tell
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+def _labels(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def endpoint(path):
+    # /v2/teams/12345/rankings?season%5B%5D=181 -> /v2/teams/{id}/rankings, so labels stay few
+    return re.sub(r"/\d+", "/{id}", path.split("?", 1)[0])
+
+
+class Metrics:
+    # Latency histograms, counters and gauges kept in process. Everything is exported in the
+    # Prometheus text format, written to a file for a textfile collector and/or served over HTTP.
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.started = time.time()
+        self._task = None
+        self._server = None
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _labels(labels))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _labels(labels))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def gauge(self, name, read, counter=False, **labels):
+        # read() is called at export time, so values owned by other objects are never copied.
+        # counter=True exports a running total kept elsewhere as a Prometheus counter.
+        self.gauges[(name, _labels(labels))] = (read, "counter" if counter else "gauge")
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def prometheus(self):
+        lines = []
+        declared = set()
+
+        def declare(name, kind):
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            declare(name, "histogram")
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ("+Inf",), histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        for (name, labels), value in sorted(self.counters.items()):
+            declare(name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), (read, kind) in sorted(self.gauges.items(), key=lambda item: item[0]):
+            try:
+                value = read()
+            except Exception:
+                continue
+            declare(name, kind)
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self, prefix):
+        # (labels, count, mean, p50, p95) for every histogram named prefix, busiest first
+        rows = []
+        for (name, labels), histogram in self.histograms.items():
+            if name == prefix and histogram.count:
+                rows.append((dict(labels), histogram.count, histogram.sum / histogram.count,
+                             histogram.quantile(0.5), histogram.quantile(0.95)))
+        return sorted(rows, key=lambda row: -row[1])
+
+    def report(self):
+        # Plain text for the /stats command: where the time goes, then the cache and budget numbers
+        sections = [
+            ("Commands", "command_seconds", "command"),
+            ("RobotEvents", "robotevents_request_seconds", "endpoint"),
+            ("Firebase", "firebase_call_seconds", "op"),
+            ("Inference", "inference_seconds", "model"),
+        ]
+        lines = []
+        for title, name, label in sections:
+            rows = self.summary(name)
+            if not rows:
+                continue
+            lines.append(f"{title} (count, mean, p50, p95):")
+            for labels, count, mean, p50, p95 in rows:
+                extra = "".join(f" {key}={value}" for key, value in labels.items() if key != label)
+                lines.append(f"  {labels.get(label, '-')}{extra}: {count}, {mean * 1000:.1f}ms, <={p50 * 1000:g}ms, <={p95 * 1000:g}ms")
+        gauges = []
+        for (name, labels), (read, _) in sorted(self.gauges.items(), key=lambda item: item[0]):
+            try:
+                value = read()
+            except Exception:
+                continue
+            gauges.append(f"  {name}{_format_labels(labels)}: {value:g}")
+        if gauges:
+            lines.append("Caches and budget:")
+            lines.extend(gauges)
+        lines.append(f"Up {(time.time() - self.started) / 3600:.1f}h")
+        return "\n".join(lines)
+
+    def write(self, path, text=None):
+        temp = path + ".tmp"
+        with open(temp, "w") as f:
+            f.write(self.prometheus() if text is None else text)
+        os.replace(temp, path)
+
+    async def _write_loop(self, path, interval):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                # Rendered on the loop, which owns the counters; only the file write goes to a thread
+                await asyncio.to_thread(self.write, path, self.prometheus())
+            except Exception as e:
+                print(f"Writing metrics to {path} failed: {e}")
+
+    async def _serve(self, port):
+        from aiohttp import web
+
+        async def handle(request):
+            return web.Response(text=self.prometheus(), content_type="text/plain", charset="utf-8")
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, "0.0.0.0", port).start()
+        return runner
+
+    def start(self, path=None, interval=15, port=None):
+        # Safe to call again on reconnect
+        if self._task is None and path:
+            self._task = asyncio.ensure_future(self._write_loop(path, interval))
+        if self._server is None and port:
+            self._server = asyncio.ensure_future(self._serve(port))
+        return self._task
+
+
+def track_client(metrics, client):
+    # Registers the counters a RobotEventsClient and its cache already keep
+    cache = client.cache
+    if cache is not None:
+        metrics.gauge("response_cache_lookups_total", lambda: cache.hits, counter=True, result="hit")
+        metrics.gauge("response_cache_lookups_total", lambda: cache.stale_hits, counter=True, result="stale")
+        metrics.gauge("response_cache_lookups_total", lambda: cache.misses, counter=True, result="miss")
+        metrics.gauge("response_cache_hit_ratio", lambda: (cache.hits + cache.stale_hits) / max(1, cache.hits + cache.stale_hits + cache.misses))
+        metrics.gauge("response_cache_bytes", lambda: cache.size)
+    metrics.gauge("robotevents_coalesced_total", lambda: client.flights.coalesced, counter=True)
+    metrics.gauge("robotevents_key_budget", client.keys.budget)
@@ -0,0 +1,94 @@
+import asyncio
+import time
+
+import discord
+
+PREVIOUS = "⬅️"
+NEXT = "➡️"
+
+
+class PageSession:
+    __slots__ = ("message", "pages", "owner_id", "page", "slot")
+
+    def __init__(self, message, pages, owner_id):
+        self.message = message
+        self.pages = pages
+        self.owner_id = owner_id
+        self.page = 0
+        self.slot = None
+
+
+class Paginator:
+    # One place for every paginated message. Reactions are routed with a dict lookup on the message
+    # ID instead of a wait_for check per open message, pages are rendered up front, and sessions
+    # expire through a timer wheel: a ring of buckets one tick apart, advanced by a single task.
+    def __init__(self, timeout=60, tick=1.0):
+        self.timeout = timeout
+        self.tick = tick
+        self.sessions = {}
+        self._wheel = [set() for _ in range(int(timeout / tick) + 1)]
+        self._cursor = 0
+        self._task = None
+        self._tasks = set()
+
+    def __len__(self):
+        return len(self.sessions)
+
+    async def send(self, message, pages, owner_id):
+        # message already shows pages[0]; the arrows are only added when there is somewhere to go
+        if len(pages) < 2:
+            return
+        session = PageSession(message, pages, owner_id)
+        self.sessions[message.id] = session
+        self._schedule(session)
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run_wheel())
+        await message.add_reaction(PREVIOUS)
+        await message.add_reaction(NEXT)
+
+    def _schedule(self, session):
+        # The bucket just behind the cursor is the last one it reaches, a full timeout from now
+        if session.slot is not None:
+            self._wheel[session.slot].discard(session.message.id)
+        session.slot = (self._cursor - 1) % len(self._wheel)
+        self._wheel[session.slot].add(session.message.id)
+
+    async def _run_wheel(self):
+        next_tick = time.monotonic()
+        while self.sessions:
+            next_tick += self.tick
+            await asyncio.sleep(max(0, next_tick - time.monotonic()))
+            expired, self._wheel[self._cursor] = self._wheel[self._cursor], set()
+            self._cursor = (self._cursor + 1) % len(self._wheel)
+            for message_id in expired:
+                session = self.sessions.pop(message_id, None)
+                if session is not None:
+                    self._spawn(self._expire(session))
+        self._task = None
+
+    def _spawn(self, coroutine):
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _expire(self, session):
+        try:
+            await session.message.clear_reactions()
+        except (discord.Forbidden, discord.NotFound):
+            pass
+
+    async def on_raw_reaction_add(self, payload):
+        # Registered with bot.add_listener, so it sees reactions on messages outside the cache too
+        session = self.sessions.get(payload.message_id)
+        if session is None or payload.user_id != session.owner_id:
+            return
+        emoji = str(payload.emoji)
+        if emoji not in (PREVIOUS, NEXT):
+            return
+        session.page = (session.page + (1 if emoji == NEXT else -1)) % len(session.pages)
+        self._schedule(session)
+        await session.message.edit(embed=session.pages[session.page])
+        try:
+            await session.message.remove_reaction(payload.emoji, payload.member or discord.Object(payload.user_id))
+        except (discord.Forbidden, discord.NotFound):
+            pass
@@ -0,0 +1,31 @@
+import asyncio
+
+
+async def gather_team_features(teams, get_team_id, get_team_data, limit=8):
+    # Resolve and fetch every team at once; each team's ID lookup and rankings fetch is chained,
+    # so the whole batch costs about one round-trip instead of one per team
+    semaphore = asyncio.Semaphore(limit)
+
+    async def fetch(team):
+        async with semaphore:
+            team_id = await get_team_id(team)
+        if team_id is None:
+            raise LookupError(f"Team {team} not found")
+        async with semaphore:
+            team_data = await get_team_data(team_id)
+        return [team_data['Average_AP'], team_data['Average_SP'], team_data['Average_Average_Points']]
+
+    results = await asyncio.gather(*(fetch(team) for team in teams), return_exceptions=True)
+
+    rows = []
+    errors = {}
+    for team, result in zip(teams, results):
+        if isinstance(result, BaseException):
+            errors[team] = str(result) or type(result).__name__
+        else:
+            rows.append(result)
+    return rows, errors
+
+
+def format_errors(errors):
+    return "\n".join(f"{team}: {error}" for team, error in errors.items())
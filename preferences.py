@@ -0,0 +1,143 @@
+import asyncio
+import sqlite3
+import time
+
+from user_teams import UserTeams
+
+
+class LocalPreferences:
+    # User settings in a local SQLite file (WAL mode) mirrored in a dict, so reads never leave the
+    # process. With a replica (UserTeams), local writes are pushed to Firebase in batches in the
+    # background and changes made in Firebase are pulled in; without one it runs fully offline.
+    def __init__(self, path="preferences.db", replica=None, flush_interval=2.0, batch_size=500):
+        self.replica = replica
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        # WAL with synchronous=NORMAL only fsyncs at checkpoints, which keeps single-row writes cheap
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS preferences ("
+            "user_id TEXT PRIMARY KEY, team TEXT NOT NULL, updated_at REAL NOT NULL, synced INTEGER NOT NULL)"
+        )
+        self.db.commit()
+        self.teams = {}
+        self._pending = set()
+        for user_id, team, synced in self.db.execute("SELECT user_id, team, synced FROM preferences"):
+            self.teams[user_id] = team
+            if not synced:
+                self._pending.add(user_id)
+        self._task = None
+        self._flusher = None
+        self._commit_pending = False
+        if replica is not None:
+            replica.on_change.append(self._remote_change)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._prime())
+        return self._task
+
+    async def _prime(self):
+        if self.replica is None:
+            return
+        try:
+            await self.replica.start()
+        except Exception as e:
+            # Local reads and writes carry on; unsynced rows wait for a later flush
+            print(f"Firebase preferences unavailable, running locally: {e}")
+        else:
+            # Users deleted from Firebase while the bot was down never show up as a change
+            for user_id in [user_id for user_id in self.teams if user_id not in self.replica.teams]:
+                self._remote_change(user_id, None)
+        self._flusher = asyncio.ensure_future(self._flush_loop())
+
+    async def _flush_loop(self):
+        while True:
+            await self.flush()
+            await asyncio.sleep(self.flush_interval)
+
+    def _remote_change(self, user_id, team):
+        # A user with an unsynced local write keeps it; it reaches Firebase on the next flush
+        if user_id in self._pending or self.teams.get(user_id) == team:
+            return
+        if team is None:
+            self.teams.pop(user_id, None)
+            self.db.execute("DELETE FROM preferences WHERE user_id = ?", (user_id,))
+        else:
+            self.teams[user_id] = team
+            self.db.execute("INSERT OR REPLACE INTO preferences VALUES (?, ?, ?, 1)", (user_id, team, time.time()))
+        # A snapshot reports every user in one go; they all share a single commit
+        if not self._commit_pending:
+            self._commit_pending = True
+            asyncio.get_running_loop().call_soon(self._commit)
+
+    def _commit(self):
+        if self._commit_pending:
+            self._commit_pending = False
+            self.db.commit()
+
+    async def get(self, user_id):
+        team = self.teams.get(str(user_id))
+        # Before the first sync a user may only exist in Firebase
+        if team is None and self.replica is not None and not self.replica.ready:
+            try:
+                return await self.replica.get(user_id)
+            except Exception:
+                return None
+        return team
+
+    async def set(self, user_id, team):
+        user_id, team = str(user_id), str(team)
+        self.teams[user_id] = team
+        self.db.execute("INSERT OR REPLACE INTO preferences VALUES (?, ?, ?, ?)",
+                        (user_id, team, time.time(), 0 if self.replica is not None else 1))
+        self.db.commit()
+        if self.replica is not None:
+            self._pending.add(user_id)
+
+    async def flush(self):
+        # Pushes unsynced rows to Firebase, batch_size users per update; returns how many were pushed
+        pushed = 0
+        while self._pending:
+            users = list(self._pending)[:self.batch_size]
+            batch = {user_id: self.teams[user_id] for user_id in users}
+            try:
+                await self.replica.set_many(batch)
+            except Exception as e:
+                print(f"Could not sync {len(batch)} preferences to Firebase: {e}")
+                break
+            # A user who changed team again during the push stays pending for the next flush
+            synced = [user_id for user_id in users if self.teams.get(user_id) == batch[user_id]]
+            self.db.executemany("UPDATE preferences SET synced = 1 WHERE user_id = ? AND team = ?",
+                                [(user_id, batch[user_id]) for user_id in synced])
+            self.db.commit()
+            self._pending.difference_update(synced)
+            pushed += len(synced)
+            if len(synced) < len(users):
+                break
+        return pushed
+
+    async def close(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        if self.replica is not None:
+            await self.flush()
+            await self.replica.close()
+        self._commit()
+        self.db.close()
+
+
+def open_preferences(backend, database, metrics=None, path=None):
+    # "sqlite": local reads with Firebase replication (default), "firebase": cached Firebase only,
+    # "offline": local only, so nothing ever connects to Firebase. Offline rows are stored as synced,
+    # so they get their own file; sharing one with "sqlite" would keep them out of Firebase for good.
+    if backend == "firebase":
+        return UserTeams(database, metrics)
+    if backend == "offline":
+        return LocalPreferences(path or "preferences-offline.db")
+    if backend == "sqlite":
+        return LocalPreferences(path or "preferences.db", replica=UserTeams(database, metrics))
+    raise ValueError(f"Unknown preferences backend {backend!r}; use sqlite, firebase or offline")
@@ -0,0 +1,70 @@
+import asyncio
+from collections import Counter
+
+# The same requests the commands make for a team, so prefetched responses land on the keys they read
+TEAM_PATHS = [
+    "/v2/teams/{team_id}/rankings?season%5B%5D=181&season%5B%5D=182&season%5B%5D=180",
+    "/v2/teams/{team_id}/awards?season%5B%5D=181&season%5B%5D=182&season%5B%5D=180",
+]
+MATCHES_PATH = "/v2/teams/{team_id}/matches?season%5B%5D=181"
+
+
+class Prefetcher:
+    # Walks every team users have picked with setteam, most popular first, and refreshes the data
+    # the default-team commands need before anyone asks. It runs one request at a time and pauses
+    # whenever the key pool drops below `reserve` of its capacity, so commands always keep budget.
+    # `program` must match the one the bot's commands resolve team numbers with, or a number shared
+    # by several programs can warm a different team than the commands later read.
+    def __init__(self, client, preferences, team_index, feature_store, program=None, interval=15 * 60, reserve=0.5, pause=1.0):
+        self.client = client
+        self.program = program
+        self.preferences = preferences
+        self.team_index = team_index
+        self.feature_store = feature_store
+        self.interval = interval
+        self.reserve = reserve
+        self.pause = pause
+        self.prefetched = 0
+        self._task = None
+
+    def registered_teams(self):
+        counts = Counter(team.upper() for team in self.preferences.teams.values() if team)
+        return [team for team, _ in counts.most_common()]
+
+    async def _wait_for_budget(self):
+        keys = self.client.keys
+        while keys.budget() < self.reserve * keys.capacity():
+            await asyncio.sleep(self.pause)
+
+    async def prefetch_team(self, team_number):
+        await self._wait_for_budget()
+        team_id = await self.team_index.resolve(self.client, team_number, self.program)
+        if team_id is None:
+            return
+        for path in TEAM_PATHS:
+            await self._wait_for_budget()
+            await self.client.get(path.format(team_id=team_id))
+        await self._wait_for_budget()
+        async for _ in self.client.paginate(MATCHES_PATH.format(team_id=team_id)):
+            pass
+        if not self.feature_store.is_fresh(team_id):
+            await self._wait_for_budget()
+            await self.feature_store.refresh(self.client, team_id)
+        self.prefetched += 1
+
+    async def run_once(self):
+        for team_number in self.registered_teams():
+            try:
+                await self.prefetch_team(team_number)
+            except Exception as e:
+                print(f"Prefetch of {team_number} failed: {e}")
+
+    async def _loop(self):
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        # Safe to call again; only one loop is ever running
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
@@ -0,0 +1,112 @@
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+# (pattern, ttl, max_stale) in seconds, first match wins. A response is fresh for ttl; after that it
+# is still served for up to max_stale more while a background request replaces it.
+DEFAULT_TTLS = [
+    (r"^/v2/teams\?", 24 * 3600, 7 * 24 * 3600),  # team info by number barely changes
+    (r"^/v2/teams/\d+/(rankings|awards)", 30 * 60, 6 * 3600),
+    (r"^/v2/teams/\d+/matches", 10 * 60, 3600),
+    (r"^/v2/events/\d+/divisions/\d+/matches", 60, 5 * 60),  # live scores during an event
+    (r"^/v2/events/\d+/teams", 15 * 60, 3600),
+]
+# Skills standings aren't listed: SkillsLeaderboard keeps its own snapshot and fetches with cache=False
+DEFAULT_TTL = (5 * 60, 30 * 60)
+
+
+def normalize(path):
+    # The same request written with a different parameter order or encoding maps to one key
+    parts = urlsplit(path)
+    query = sorted(parse_qsl(parts.query, keep_blank_values=True))
+    return parts.path.rstrip("/").lower() + ("?" + urlencode(query) if query else "")
+
+
+class CacheEntry:
+    __slots__ = ("value", "size", "stored_at", "fresh_until", "stale_until")
+
+    def __init__(self, value, size, ttl, max_stale, stored_at=None):
+        # stored_at is wall-clock time so entries can outlive the process (see warm_cache.py)
+        self.stored_at = time.time() if stored_at is None else stored_at
+        expires = time.monotonic() - (time.time() - self.stored_at) + ttl
+        self.value = value
+        self.size = size
+        self.fresh_until = expires
+        self.stale_until = expires + max_stale
+
+
+class ResponseCache:
+    # LRU cache of decoded RobotEvents responses, bounded by the size of the response bodies.
+    # Cached values are shared between callers, so they must be treated as read-only.
+    def __init__(self, max_bytes=64 * 2 ** 20, ttls=DEFAULT_TTLS, default_ttl=DEFAULT_TTL):
+        self.max_bytes = max_bytes
+        self.ttls = [(re.compile(pattern), ttl, max_stale) for pattern, ttl, max_stale in ttls]
+        self.default_ttl = default_ttl
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._refreshing = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def ttl_for(self, key):
+        for pattern, ttl, max_stale in self.ttls:
+            if pattern.search(key):
+                return ttl, max_stale
+        return self.default_ttl
+
+    def _store(self, key, value, size, stored_at=None):
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.size -= old.size
+        if size > self.max_bytes:
+            return
+        self.entries[key] = CacheEntry(value, size, *self.ttl_for(key), stored_at)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= evicted.size
+
+    async def _refresh(self, key, path, fetch):
+        try:
+            self._store(key, *await fetch(path))
+        except Exception as e:
+            print(f"Background refresh of {path} failed: {e}")
+        finally:
+            del self._refreshing[key]
+
+    async def get(self, path, fetch):
+        # fetch(path) must return (value, size in bytes)
+        key = normalize(path)
+        entry = self.entries.get(key)
+        now = time.monotonic()
+        if entry is not None and now < entry.stale_until:
+            self.entries.move_to_end(key)
+            if now < entry.fresh_until:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+                if key not in self._refreshing:
+                    self._refreshing[key] = asyncio.ensure_future(self._refresh(key, path, fetch))
+            return entry.value
+
+        self.misses += 1
+        value, size = await fetch(path)
+        self._store(key, value, size)
+        return value
+
+    def restore(self, key, value, size, stored_at):
+        # Loads an entry saved by an earlier run. Its age carries over, so one that went stale while
+        # the bot was down is served stale and revalidated, and one past its stale window is dropped.
+        # An entry fetched since startup is at least as new, so it is kept.
+        ttl, max_stale = self.ttl_for(key)
+        current = self.entries.get(key)
+        if time.time() - stored_at >= ttl + max_stale or (current is not None and current.stored_at >= stored_at):
+            return False
+        self._store(key, value, size, stored_at)
+        return True
@@ -0,0 +1,94 @@
+import asyncio
+import json
+import time
+
+import aiohttp
+
+from keypool import KeyPool
+from metrics import endpoint
+from response_cache import normalize
+from singleflight import SingleFlight
+
+BASE_URL = "https://www.robotevents.com/api"
+
+
+class RobotEventsClient:
+    # One keep-alive connection pool shared by every command. Requests are spread over the API keys
+    # in the pool, which can be a single token, a list of tokens or a KeyPool shared with other clients.
+    # With a ResponseCache, repeated GETs are answered from memory, and identical GETs that are in
+    # flight at the same time always share one request.
+    def __init__(self, keys, max_connections=20, timeout=15, retries=3, cache=None, metrics=None):
+        if isinstance(keys, str):
+            keys = [keys]
+        self.keys = keys if isinstance(keys, KeyPool) else KeyPool(keys)
+        self.headers = {"accept": "application/json"}
+        self.max_connections = max_connections
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.retries = retries
+        self.cache = cache
+        self.metrics = metrics
+        self.flights = SingleFlight()
+        self._session = None
+
+    def session(self):
+        # The session has to be created inside the running event loop, so it is built on first use
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector, headers=self.headers, timeout=self.timeout)
+        return self._session
+
+    async def get(self, path, cache=True):
+        # Callers that keep their own refreshed copy pass cache=False to always hit the API
+        if cache and self.cache is not None:
+            return await self.cache.get(path, self._fetch)
+        return (await self._fetch(path))[0]
+
+    async def _fetch(self, path):
+        # Returns the decoded body and its size, which the cache uses for its memory budget
+        return await self.flights.do(normalize(path), lambda: self._request(path))
+
+    async def _request(self, path):
+        for attempt in range(self.retries + 1):
+            waited = time.perf_counter()
+            key = await self.keys.acquire()
+            start = time.perf_counter()
+            status = "error"
+            try:
+                async with self.session().get(BASE_URL + path, headers={"Authorization": f"Bearer {key}"}) as response:
+                    status = response.status
+                    self.keys.update(key, response.status, response.headers)
+                    # A 429 parks that key, so the retry goes out on whichever key still has budget
+                    if response.status == 429 and attempt < self.retries:
+                        continue
+                    response.raise_for_status()
+                    body = await response.read()
+                    return json.loads(body), len(body)
+            finally:
+                if self.metrics is not None:
+                    # Time spent waiting for rate limit budget is kept apart from time on the wire
+                    self.metrics.observe("robotevents_key_wait_seconds", start - waited)
+                    self.metrics.observe("robotevents_request_seconds", time.perf_counter() - start,
+                                         endpoint=endpoint(path), status=status)
+
+    async def paginate(self, path, per_page=250, cache=True):
+        # Yields records one page at a time while the following page is already downloading
+        separator = "&" if "?" in path else "?"
+        page = 1
+        pending = asyncio.create_task(self.get(f"{path}{separator}per_page={per_page}&page={page}", cache))
+        try:
+            while pending is not None:
+                data = await pending
+                pending = None
+                if page < data["meta"]["last_page"]:
+                    page += 1
+                    pending = asyncio.create_task(self.get(f"{path}{separator}per_page={per_page}&page={page}", cache))
+                for record in data["data"]:
+                    yield record
+        finally:
+            # The consumer stopped early (or a request failed), so don't leave the prefetch running
+            if pending is not None:
+                pending.cancel()
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
@@ -0,0 +1,28 @@
+import asyncio
+
+
+class SingleFlight:
+    # Concurrent calls with the same key share one in-flight call and all get its result (or its
+    # exception). Nothing is kept once the call finishes; caching is left to the layers above.
+    def __init__(self):
+        self._calls = {}
+        self.requests = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self._calls)
+
+    async def do(self, key, call):
+        self.requests += 1
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Shielded so one caller giving up doesn't cancel the request for the others
+        return await asyncio.shield(task)
+
+    def stats(self):
+        return {'requests': self.requests, 'coalesced': self.coalesced, 'in_flight': len(self._calls)}
@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+
+class StartupTimeline:
+    # Records how long each startup phase took, relative to when the bot process started
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last_mark = self.started
+        self.phases = {}
+
+    def mark(self, name):
+        # Ends a sequential phase that began at the previous mark; repeated marks are ignored
+        if name not in self.phases:
+            now = time.perf_counter()
+            self.phases[name] = (self._last_mark, now)
+            self._last_mark = now
+
+    def record(self, name, start):
+        # Background phases overlap the sequential ones, so they carry their own start time
+        self.phases[name] = (start, time.perf_counter())
+
+    def report(self):
+        lines = []
+        for name, (start, end) in sorted(self.phases.items(), key=lambda item: item[1][0]):
+            lines.append(f"{name}: +{(start - self.started) * 1000:.0f}ms, took {(end - start) * 1000:.0f}ms")
+        return "\n".join(lines)
+
+
+class Deferred:
+    # Runs a blocking loader once in a worker thread, started either in the background or by the
+    # first caller that needs its value
+    def __init__(self, load, timeline=None, name=None):
+        self._load = load
+        self._timeline = timeline
+        self._name = name
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+        return self._task
+
+    async def _run(self):
+        start = time.perf_counter()
+        try:
+            value = await asyncio.to_thread(self._load)
+        except Exception:
+            # Let the next caller try again instead of caching the failure
+            self._task = None
+            raise
+        if self._timeline is not None:
+            self._timeline.record(self._name, start)
+        return value
+
+    async def get(self):
+        # Shielded so a cancelled command doesn't cancel the load for everyone else
+        return await asyncio.shield(self.start())
+
+    def done(self):
+        return self._task is not None and self._task.done()
+
+
+# One per process; each bot imports this module first, so the clock starts with the process
+timeline = StartupTimeline()
@@ -0,0 +1,87 @@
+import sqlite3
+import time
+
+
+class TeamIndex:
+    # Team number -> RobotEvents team ID, persisted in SQLite and mirrored in a dict for lookups
+    def __init__(self, path="team_index.db", max_age=7 * 24 * 3600, miss_ttl=15 * 60):
+        self.max_age = max_age
+        self.miss_ttl = miss_ttl
+        self.db = sqlite3.connect(path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS teams ("
+            "number TEXT NOT NULL, program INTEGER NOT NULL, id INTEGER NOT NULL, fetched_at REAL NOT NULL, "
+            "PRIMARY KEY (number, program))"
+        )
+        self.db.commit()
+        self._ids = {}
+        self._misses = {}
+        for number, program, team_id, fetched_at in self.db.execute("SELECT number, program, id, fetched_at FROM teams"):
+            self._ids.setdefault(number, {})[program] = (team_id, fetched_at)
+
+    def __len__(self):
+        return sum(len(programs) for programs in self._ids.values())
+
+    def lookup(self, team_number, program=None):
+        # Returns (team_id, fetched_at) or None without touching the network
+        programs = self._ids.get(str(team_number).upper())
+        if not programs:
+            return None
+        if program is None:
+            return next(iter(programs.values()))
+        return programs.get(program)
+
+    def store(self, teams):
+        now = time.time()
+        rows = []
+        for team in teams:
+            number = team["number"].upper()
+            program = team["program"]["id"]
+            self._ids.setdefault(number, {})[program] = (team["id"], now)
+            self._misses.pop(number, None)
+            rows.append((number, program, team["id"], now))
+        self.db.executemany("INSERT OR REPLACE INTO teams VALUES (?, ?, ?, ?)", rows)
+        self.db.commit()
+        return len(rows)
+
+    async def resolve(self, client, team_number, program=None):
+        team_number = str(team_number).upper()
+        hit = self.lookup(team_number, program)
+        if hit and time.time() - hit[1] < self.max_age:
+            return hit[0]
+        # Unknown numbers are remembered for a while so typos don't hit the API on every command
+        if not hit and time.time() - self._misses.get(team_number, 0) < self.miss_ttl:
+            return None
+
+        path = f"/v2/teams?number%5B%5D={team_number}&myTeams=false"
+        if program is not None:
+            path += f"&program%5B%5D={program}"
+        try:
+            data = await client.get(path)
+        except Exception:
+            # A stale ID is still far better than failing the command
+            if hit:
+                return hit[0]
+            raise
+        if data and data["data"]:
+            self.store(data["data"])
+            hit = self.lookup(team_number, program)
+        if not hit:
+            self._misses[team_number] = time.time()
+            return None
+        return hit[0]
+
+    async def populate(self, client, program=1, registered=True):
+        # Bulk load every team in a program; the teams endpoint has no season filter, so
+        # "registered" is used to narrow it down to the teams competing this season
+        path = f"/v2/teams?program%5B%5D={program}&myTeams=false"
+        if registered:
+            path += "&registered=true"
+        total = 0
+        batch = []
+        async for team in client.paginate(path, cache=False):
+            batch.append(team)
+            if len(batch) >= 250:
+                total += self.store(batch)
+                batch = []
+        return total + self.store(batch)
@@ -0,0 +1,78 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+import dataset as dataset_module
+from dataset import Dataset, UNKNOWN_EVENT
+
+
+def _rows(event_ids, team_ids):
+    count = len(event_ids)
+    return {'Event_ID': event_ids, 'Match_Number': [1] * count, 'Team_ID': team_ids,
+            'Average_AP': [1.0] * count, 'Average_SP': [2.0] * count, 'Average_Average_Points': [3.0] * count,
+            'Winner': [0] * count}
+
+
+def _filled(root):
+    dataset = Dataset(root)
+    # Rows without an event can't be deduplicated, so a bad compaction would show up as extra rows
+    dataset.append(_rows([UNKNOWN_EVENT] * 3, [1, 2, 3]))
+    dataset.append(_rows([5, 5], [1, 2]))
+    dataset.append(_rows([6], [1]))
+    return dataset
+
+
+def test_append_drops_known_and_repeated_keys(tmp_path):
+    dataset = _filled(str(tmp_path / 'data'))
+    assert dataset.append(_rows([5, 6, 7, 7, UNKNOWN_EVENT], [1, 2, 3, 3, 1])) == 3
+    assert len(Dataset(str(tmp_path / 'data'))) == 9
+
+
+def test_compact_merges_into_one_partition(tmp_path):
+    dataset = _filled(str(tmp_path / 'data'))
+    before = dataset.load()
+    dataset.compact()
+    assert [os.path.basename(part) for part in dataset.partitions()] == ['part-00000']
+    after = dataset.load()
+    assert all(np.array_equal(before[name], after[name]) for name in before)
+
+
+def test_compact_interrupted_before_cleanup_never_duplicates(tmp_path, monkeypatch):
+    root = str(tmp_path / 'data')
+    _filled(root)
+    # The merged partition is written, then the process dies before any original is removed
+    monkeypatch.setattr(Dataset, '_finish_compact', lambda self: None)
+    Dataset(root).compact()
+    assert len(os.listdir(root)) == 4
+    assert len(Dataset(root)) == 6
+    monkeypatch.undo()
+
+    reopened = Dataset(root)
+    assert [os.path.basename(part) for part in reopened.partitions()] == ['part-00000']
+    assert sorted(os.listdir(root)) == ['part-00000']
+    assert len(reopened) == 6
+
+
+def test_compact_interrupted_while_deleting(tmp_path, monkeypatch):
+    root = str(tmp_path / 'data')
+    _filled(root)
+    removed = []
+    rmtree = shutil.rmtree
+
+    def crash_after_first(path, *args, **kwargs):
+        # Dies after the first replaced partition has been deleted
+        if any(os.path.basename(done).startswith('part-') for done in removed):
+            raise KeyboardInterrupt
+        removed.append(path)
+        rmtree(path, *args, **kwargs)
+
+    monkeypatch.setattr(dataset_module.shutil, 'rmtree', crash_after_first)
+    with pytest.raises(KeyboardInterrupt):
+        Dataset(root).compact()
+    monkeypatch.undo()
+    assert not os.path.exists(os.path.join(root, 'part-00000'))
+
+    assert len(Dataset(root)) == 6
+    assert sorted(os.listdir(root)) == ['part-00000']
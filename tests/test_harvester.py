@@ -0,0 +1,58 @@
+import asyncio
+import json
+
+from dataset import Dataset
+from features import FeatureStore
+from harvester import Harvester
+
+
+def _match(blue, red, blue_score, red_score):
+    return {'alliances': [
+        {'score': blue_score, 'teams': [{'team': {'id': team_id}} for team_id in blue]},
+        {'score': red_score, 'teams': [{'team': {'id': team_id}} for team_id in red]},
+    ]}
+
+
+class FakeClient:
+    def __init__(self, matches):
+        self.matches = matches
+
+    async def paginate(self, path, per_page=250, cache=True):
+        parts = path.strip('/').split('/')
+        if parts[1] == 'events':
+            entries = self.matches[int(parts[2])]
+        else:
+            team_id = int(parts[2])
+            entries = [{'id': team_id, 'ap': team_id, 'sp': 1, 'average_points': 2.5}]
+        for entry in entries:
+            yield entry
+
+
+def test_run_writes_into_the_given_empty_dataset(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = FakeClient({7: [_match([1, 2], [3, 4], 10, 5), _match([1, 3], [2, 4], 2, 8)]})
+    dataset = Dataset(str(tmp_path / 'hds'))
+    checkpoint = str(tmp_path / 'checkpoint.json')
+
+    asyncio.run(Harvester(client, FeatureStore(), dataset, checkpoint=checkpoint).run([7]))
+
+    assert not (tmp_path / 'training_data').exists()
+    rows = Dataset(str(tmp_path / 'hds')).load()
+    assert len(rows['Winner']) == 8
+    assert set(rows['Event_ID'].tolist()) == {7}
+    with open(checkpoint) as f:
+        assert json.load(f)['events'] == [7]
+
+
+def test_rerun_skips_finished_events_and_known_rows(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = FakeClient({7: [_match([1, 2], [3, 4], 10, 5)], 8: [_match([5, 6], [7, 8], 1, 0)]})
+    dataset = Dataset(str(tmp_path / 'hds'))
+    checkpoint = str(tmp_path / 'checkpoint.json')
+
+    asyncio.run(Harvester(client, FeatureStore(), dataset, checkpoint=checkpoint).run([7]))
+    # Event 7 is checkpointed, and a fresh Harvester must not write its rows twice
+    asyncio.run(Harvester(client, FeatureStore(), Dataset(str(tmp_path / 'hds')), checkpoint=checkpoint).run([7, 8]))
+
+    rows = Dataset(str(tmp_path / 'hds')).load()
+    assert sorted(rows['Event_ID'].tolist()) == [7] * 4 + [8] * 4
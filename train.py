@@ -0,0 +1,142 @@
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import mean_squared_error
+from sklearn.model_selection import train_test_split
+
+from compiled_models import export
+from dataset import Dataset, FEATURES
+
+# Headless replacement for running linear3.py, forest1.py and gradientboost.py one after another:
+# the dataset is loaded once, every model trains in its own process, and a JSON summary is printed.
+# python train.py [linear] [random_forest] [gradient_boosting]
+MODELS = {
+    'linear': {
+        'path': 'linear_regression_model.pkl',
+        'estimator': LinearRegression,
+        'params': {},
+        'test_size': 0.2,
+    },
+    'random_forest': {
+        'path': 'random_forest_model.pkl',
+        'estimator': RandomForestRegressor,
+        'params': {'n_estimators': 100, 'random_state': 42},
+        'test_size': 0.1,
+    },
+    'gradient_boosting': {
+        'path': 'gradient_boosting_model.pkl',
+        'estimator': GradientBoostingRegressor,
+        'params': {'n_estimators': 100, 'learning_rate': 0.1, 'random_state': 1},
+        'test_size': 0.2,
+    },
+}
+# Written by tune.py; when present its parameters replace the defaults above
+HYPERPARAMETERS = 'hyperparameters.json'
+
+_X = None
+_y = None
+
+
+def _init_worker(X, y):
+    # Each worker receives the training arrays once, instead of once per task
+    global _X, _y
+    _X, _y = X, y
+
+
+def atomic_dump(model, path):
+    # Dumped next to the target and renamed over it, so the bot never loads a half-written pickle
+    fd, temp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            joblib.dump(model, f)
+        os.replace(temp, path)
+    except BaseException:
+        os.remove(temp)
+        raise
+
+
+def predict_latency(model, X, repeats=50):
+    # Median seconds for one predict call, which is what a single matchup costs the bot
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict(X)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def model_params(name):
+    params = dict(MODELS[name]['params'])
+    if os.path.exists(HYPERPARAMETERS):
+        with open(HYPERPARAMETERS) as f:
+            tuned = json.load(f).get(name, {})
+        # tune.py also records how many rows the winner was picked on
+        params.update({key: value for key, value in tuned.items() if key != 'rows'})
+    return params
+
+
+def build_model(name, params=None):
+    return MODELS[name]['estimator'](**(model_params(name) if params is None else params))
+
+
+def train_model(name, X=None, y=None, save=True):
+    X = _X if X is None else X
+    y = _y if y is None else y
+    spec = MODELS[name]
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=spec['test_size'], random_state=1)
+
+    model = build_model(name)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_time = time.perf_counter() - start
+
+    report = {
+        'model': name,
+        'path': spec['path'],
+        'train_rows': len(X_train),
+        'test_rows': len(X_test),
+        'fit_seconds': fit_time,
+        'predict_row_ms': predict_latency(model, X_test[:4]) * 1000,
+        'predict_batch_ms': predict_latency(model, X_test, repeats=5) * 1000,
+        'mse': float(mean_squared_error(y_test, model.predict(X_test))),
+        'params': model.get_params(),
+    }
+    if save:
+        atomic_dump(model, spec['path'])
+        report['compiled_max_error'] = export(spec['path'], X_test)
+    return model, report
+
+
+def _train_in_worker(name):
+    return train_model(name)[1]
+
+
+def load_training_data(dataset=None):
+    columns = (dataset or Dataset()).load(FEATURES + ['Winner'])
+    X = np.column_stack([columns[name] for name in FEATURES]).astype(np.float64)
+    return X, np.asarray(columns['Winner'], dtype=np.float64)
+
+
+def train_all(names=None, workers=None):
+    names = list(names or MODELS)
+    X, y = load_training_data()
+    with ProcessPoolExecutor(max_workers=workers or min(len(names), os.cpu_count() or 1),
+                             initializer=_init_worker, initargs=(X, y)) as pool:
+        return list(pool.map(_train_in_worker, names))
+
+
+if __name__ == '__main__':
+    names = sys.argv[1:]
+    unknown = [name for name in names if name not in MODELS]
+    if unknown:
+        sys.exit(f"Unknown model(s) {', '.join(unknown)}; choose from {', '.join(MODELS)}")
+    json.dump(train_all(names), sys.stdout, indent=2)
+    print()
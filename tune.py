@@ -0,0 +1,193 @@
+import itertools
+import json
+import os
+import random as rand
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+from sklearn.metrics import mean_squared_error
+from sklearn.model_selection import KFold
+
+import train
+from compiled_models import CompiledModel, compile_model
+
+# Hyperparameter search for the tree models. Configurations are sampled from SPACES and raced with
+# successive halving: every configuration is cross-validated on a small slice of the data, only the
+# best 1/ETA move on to ETA times as many rows, and so on until one configuration per model is left.
+# Folds run across every core, and the search stops launching work once the time budget is spent.
+# Winners are only saved when their last rung used every row, unless --force is given.
+# python tune.py [budget_seconds] [--force] [random_forest] [gradient_boosting]
+SPACES = {
+    'random_forest': {
+        'n_estimators': [25, 50, 100, 200],
+        'max_depth': [4, 6, 8, 12, None],
+        'min_samples_leaf': [1, 5, 20, 50],
+        'max_features': [1, 2, 3],
+    },
+    'gradient_boosting': {
+        'n_estimators': [50, 100, 200, 400],
+        'learning_rate': [0.02, 0.05, 0.1, 0.2],
+        'max_depth': [2, 3, 4],
+        'min_samples_leaf': [1, 10, 50],
+        'subsample': [0.7, 1.0],
+    },
+}
+# Fixed for every candidate. Boosting stops adding trees once a held-out slice stops improving, so
+# large n_estimators only cost latency when they actually help.
+FIXED = {
+    'random_forest': {'random_state': 42},
+    'gradient_boosting': {'random_state': 1, 'n_iter_no_change': 10, 'validation_fraction': 0.1},
+}
+ETA = 3
+FOLDS = 5
+# The winner runs on every /matchup, so each millisecond of single-row predict time (on the compiled
+# model the bot actually uses) costs as much as this much MSE
+LATENCY_WEIGHT = 0.002
+
+
+def sample_configs(name, count, seed=1):
+    space = SPACES[name]
+    grid = [dict(zip(space, values)) for values in itertools.product(*space.values())]
+    rand.Random(seed).shuffle(grid)
+    return [{**config, **FIXED[name]} for config in grid[:count]]
+
+
+def compiled_latency(model, X, repeats=200):
+    compiled = CompiledModel(compile_model(model))
+    rows = X[:4]
+    start = time.perf_counter()
+    for _ in range(repeats):
+        compiled.predict(rows)
+    return (time.perf_counter() - start) / repeats
+
+
+def _evaluate_fold(name, params, train_index, test_index):
+    # Runs in a worker; the training arrays come from train._init_worker
+    X, y = train._X, train._y
+    model = train.build_model(name, params)
+    model.fit(X[train_index], y[train_index])
+    mse = mean_squared_error(y[test_index], model.predict(X[test_index]))
+    return float(mse), compiled_latency(model, X[test_index])
+
+
+def score(result):
+    return result['mse'] + LATENCY_WEIGHT * result['latency_ms']
+
+
+class HalvingSearch:
+    def __init__(self, names, budget, configs=27, workers=None):
+        self.names = names
+        self.deadline = time.monotonic() + budget
+        self.configs = configs
+        self.workers = workers or os.cpu_count() or 1
+        self.rungs = []
+        self.total_rows = None
+
+    def _run_rung(self, pool, candidates, rows):
+        # Every (model, config, fold) is its own task so all cores stay busy. When the deadline passes
+        # a later rung is abandoned, while the first one is ranked on whichever folds have finished,
+        # so the search always has an answer without running past its budget
+        folds = list(KFold(FOLDS, shuffle=True, random_state=1).split(np.arange(rows)))
+        futures = {}
+        # Models take turns, and each config's folds are queued together, so a rung cut short still
+        # has complete configurations of every model to rank
+        for i in range(max(len(configs) for configs in candidates.values())):
+            for name, configs in candidates.items():
+                if i < len(configs):
+                    for train_index, test_index in folds:
+                        futures[pool.submit(_evaluate_fold, name, configs[i], train_index, test_index)] = (name, i)
+
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=max(0, self.deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done and pending:
+                for future in pending:
+                    future.cancel()
+                if self.rungs:
+                    return None
+                break
+
+        scores = {}
+        for future, (name, i) in futures.items():
+            if future.done() and not future.cancelled():
+                scores.setdefault((name, i), []).append(future.result())
+        if not scores:
+            return None
+        results = {name: [] for name in candidates}
+        for (name, i), folds_done in scores.items():
+            results[name].append({
+                'params': candidates[name][i],
+                'rows': rows,
+                'mse': float(np.mean([mse for mse, _ in folds_done])),
+                'latency_ms': float(np.median([latency for _, latency in folds_done])) * 1000,
+            })
+        for name in results:
+            results[name].sort(key=score)
+        return results
+
+    def run(self):
+        # Rungs train on a prefix of the rows, so they are shuffled once up front to make every
+        # prefix a random subsample
+        X, y = train.load_training_data()
+        order = np.random.default_rng(1).permutation(len(X))
+        X, y = X[order], y[order]
+        self.total_rows = len(X)
+        rung_count = max(1, round(np.log(self.configs) / np.log(ETA)))
+        candidates = {name: sample_configs(name, self.configs) for name in self.names}
+        # The last rung sees the whole dataset, each earlier one ETA times fewer rows
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=train._init_worker, initargs=(X, y)) as pool:
+            for rung in range(rung_count + 1):
+                rows = max(FOLDS * 20, len(X) // ETA ** (rung_count - rung))
+                results = self._run_rung(pool, candidates, rows)
+                if results is None:
+                    break
+                self.rungs.append(results)
+                if rung == rung_count or time.monotonic() >= self.deadline:
+                    break
+                keep = max(1, len(next(iter(candidates.values()))) // ETA)
+                candidates = {name: [result['params'] for result in results[name][:keep]] for name in results}
+        # A model can end up with no finished configuration if the budget ran out during the first rung
+        return {name: self.rungs[-1][name][0] for name in self.names if self.rungs and self.rungs[-1][name]}
+
+
+def main(budget=300, names=None, force=False):
+    names = list(names or SPACES)
+    search = HalvingSearch(names, budget)
+    best = search.run()
+
+    missing = [name for name in names if name not in best]
+    if missing:
+        print(f"No configuration of {', '.join(missing)} finished within the budget", file=sys.stderr)
+        if not best:
+            return best
+    # A winner picked on a subsample is only a guess at what wins on the full data
+    partial = [name for name, result in best.items() if result['rows'] < search.total_rows]
+    if partial and not force:
+        print(f"Not saving {', '.join(partial)}: the budget ran out before the full-data rung; "
+              f"raise the budget or pass --force", file=sys.stderr)
+        return best
+
+    saved = {}
+    if os.path.exists(train.HYPERPARAMETERS):
+        with open(train.HYPERPARAMETERS) as f:
+            saved = json.load(f)
+    saved.update({name: {**result['params'], 'rows': result['rows']} for name, result in best.items()})
+    temp = train.HYPERPARAMETERS + '.tmp'
+    with open(temp, 'w') as f:
+        json.dump(saved, f, indent=2)
+    os.replace(temp, train.HYPERPARAMETERS)
+    return best
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    force = '--force' in args
+    args = [arg for arg in args if arg != '--force']
+    budget = float(args.pop(0)) if args and args[0].replace('.', '', 1).isdigit() else 300
+    unknown = [name for name in args if name not in SPACES]
+    if unknown:
+        sys.exit(f"Unknown model(s) {', '.join(unknown)}; choose from {', '.join(SPACES)}")
+    json.dump(main(budget, args, force), sys.stdout, indent=2)
+    print()
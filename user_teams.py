@@ -0,0 +1,97 @@
+import asyncio
+
+
+class UserTeams:
+    # In-process copy of every user's default team. It is filled by one read of the whole database
+    # at startup, then kept current by setteam (written through to Firebase) and by a Firebase
+    # listener that sees changes made anywhere else. Firebase calls block, so they run in threads.
+    def __init__(self, database, metrics=None):
+        self.database = database
+        self.metrics = metrics
+        self.teams = {}
+        self.ready = False
+        self._loop = None
+        self._listener = None
+        self._task = None
+        # Called with (user_id, team or None) for every change Firebase reports
+        self.on_change = []
+
+    async def _call(self, op, call, *args):
+        if self.metrics is None:
+            return await asyncio.to_thread(call, *args)
+        with self.metrics.timer("firebase_call_seconds", op=op):
+            return await asyncio.to_thread(call, *args)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._prime())
+        return self._task
+
+    async def _prime(self):
+        db = await self.database.get()
+        self._loop = asyncio.get_running_loop()
+        try:
+            snapshot = await self._call("bulk_read", db.reference("/").get)
+        except Exception:
+            # Callers fall back to per-user reads, and the next start() tries again
+            self._task = None
+            raise
+        self._apply('put', '/', snapshot)
+        self.ready = True
+        # The listener's first event is the whole tree again, which _apply handles like any other put
+        self._listener = await self._call("listen", db.reference("/").listen, self._on_event)
+
+    def _on_event(self, event):
+        # Called on the listener's own thread
+        self._loop.call_soon_threadsafe(self._apply, event.event_type, event.path, event.data)
+
+    def _apply(self, event_type, path, data):
+        if self.metrics is not None:
+            self.metrics.inc("firebase_events_total", type=event_type)
+        parts = [part for part in path.split("/") if part]
+        if not parts:
+            if event_type == 'put':
+                # A put replaces the whole tree, so anyone missing from it was deleted
+                kept = {str(user_id) for user_id in (data or {})}
+                for user_id in [user_id for user_id in self.teams if user_id not in kept]:
+                    self._set_user(user_id, None)
+            for user_id, value in (data or {}).items():
+                self._set_user(user_id, value)
+        elif len(parts) == 1:
+            if event_type == 'put' or data is None:
+                self._set_user(parts[0], data)
+            elif 'Team' in data:
+                self._set_user(parts[0], {'Team': data['Team']})
+        elif parts[1] == 'Team':
+            self._set_user(parts[0], {'Team': data})
+
+    def _set_user(self, user_id, value):
+        team = value.get('Team') if isinstance(value, dict) else None
+        if team is None:
+            self.teams.pop(str(user_id), None)
+        else:
+            self.teams[str(user_id)] = str(team)
+        for callback in self.on_change:
+            callback(str(user_id), None if team is None else str(team))
+
+    async def get(self, user_id):
+        if self.ready:
+            return self.teams.get(str(user_id))
+        db = await self.database.get()
+        return await self._call("read", db.reference(f"{user_id}/Team").get)
+
+    async def set(self, user_id, team):
+        await self.set_many({user_id: team})
+
+    async def set_many(self, teams):
+        # One root update for any number of users
+        teams = {str(user_id): str(team) for user_id, team in teams.items()}
+        db = await self.database.get()
+        await self._call("update", db.reference("/").update, {user_id: {"Team": team} for user_id, team in teams.items()})
+        # Only cached once Firebase has accepted it, so a failed write can't leave the two disagreeing
+        self.teams.update(teams)
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
@@ -0,0 +1,157 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Bumped whenever the stored layout changes; a file with another version is discarded
+FORMAT = 1
+RESPONSE = "response:"
+FEATURES = "features:"
+
+
+class DiskCache:
+    # Compressed key -> JSON value store in SQLite. Bodies use zstd when the zstandard package is
+    # installed and zlib otherwise; each row records its codec, so either can read the other's file.
+    def __init__(self, path="warm_cache.db", level=3):
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != FORMAT:
+            self.db.execute("DROP TABLE IF EXISTS entries")
+            self.db.execute(f"PRAGMA user_version = {FORMAT}")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, codec TEXT NOT NULL, body BLOB NOT NULL, size INTEGER NOT NULL, stored_at REAL NOT NULL)"
+        )
+        self.db.commit()
+        if zstandard is not None:
+            self._compressor = zstandard.ZstdCompressor(level=level)
+            self._decompressor = zstandard.ZstdDecompressor()
+        self.level = level
+
+    def _compress(self, raw):
+        if zstandard is not None:
+            return "zstd", self._compressor.compress(raw)
+        return "zlib", zlib.compress(raw, self.level)
+
+    def _decompress(self, codec, body):
+        if codec == "zlib":
+            return zlib.decompress(body)
+        if zstandard is None:
+            raise ValueError("entry was written with zstd but zstandard isn't installed")
+        return self._decompressor.decompress(body)
+
+    def put_many(self, items):
+        # items: (key, value, stored_at); blocking, so call it from a worker thread
+        rows = []
+        for key, value, stored_at in items:
+            raw = json.dumps(value, separators=(",", ":")).encode()
+            rows.append((key, *self._compress(raw), len(raw), stored_at))
+        with self._lock:
+            self.db.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)", rows)
+            self.db.commit()
+        return len(rows)
+
+    def load(self, prefix, max_age):
+        # Returns (key without prefix, value, size, stored_at), oldest first, and deletes rows older
+        # than max_age along the way
+        cutoff = time.time() - max_age
+        with self._lock:
+            self.db.execute("DELETE FROM entries WHERE key LIKE ? AND stored_at < ?", (prefix + "%", cutoff))
+            self.db.commit()
+            rows = self.db.execute(
+                "SELECT key, codec, body, size, stored_at FROM entries WHERE key LIKE ? ORDER BY stored_at", (prefix + "%",)
+            ).fetchall()
+        items = []
+        for key, codec, body, size, stored_at in rows:
+            try:
+                value = json.loads(self._decompress(codec, body))
+            except Exception:
+                continue
+            items.append((key[len(prefix):], value, size, stored_at))
+        return items
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+
+class WarmStart:
+    # Keeps the response cache and feature store on disk so a restart doesn't begin cold. Writes
+    # happen behind the in-memory layers: every interval, whatever changed since the last flush is
+    # written in a worker thread. At startup everything still within its validity window is loaded,
+    # except where the bot already holds a newer copy.
+    def __init__(self, disk, response_cache=None, feature_store=None, interval=30, max_age=7 * 24 * 3600, timeline=None):
+        self.disk = disk
+        self.response_cache = response_cache
+        self.feature_store = feature_store
+        self.interval = interval
+        self.max_age = max_age
+        self.timeline = timeline
+        # Everything restored from disk was stored before this process started, and anything cached
+        # before the load finishes is newer, so only the latter is written back by the first flush
+        self._flushed_at = time.time()
+        self._task = None
+        self._flusher = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._load())
+        return self._task
+
+    async def _load(self):
+        start = time.perf_counter()
+        restored = 0
+        if self.response_cache is not None:
+            for key, value, size, stored_at in await asyncio.to_thread(self.disk.load, RESPONSE, self.max_age):
+                restored += self.response_cache.restore(key, value, size, stored_at)
+        if self.feature_store is not None:
+            for team_id, snapshot, _, _ in await asyncio.to_thread(self.disk.load, FEATURES, self.max_age):
+                restored += self.feature_store.restore(int(team_id), snapshot)
+        if self.timeline is not None:
+            self.timeline.record("warm cache", start)
+        self._flusher = asyncio.ensure_future(self._flush_loop())
+        return restored
+
+    def _changed(self, since):
+        items = []
+        if self.response_cache is not None:
+            for key, entry in self.response_cache.entries.items():
+                if entry.stored_at > since:
+                    items.append((RESPONSE + key, entry.value, entry.stored_at))
+        if self.feature_store is not None:
+            for team_id in self.feature_store.refreshed_since(since):
+                snapshot = self.feature_store.snapshot(team_id)
+                items.append((f"{FEATURES}{team_id}", snapshot, snapshot['refreshed_at']))
+        return items
+
+    async def flush(self):
+        now = time.time()
+        items = self._changed(self._flushed_at)
+        self._flushed_at = now
+        if items:
+            await asyncio.to_thread(self.disk.put_many, items)
+        return len(items)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Warm cache flush failed: {e}")
+
+    async def close(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        await self.flush()
+        await asyncio.to_thread(self.disk.close)
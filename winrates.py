@@ -0,0 +1,92 @@
+import array
+
+import numpy as np
+
+LOSS, TIE, WIN = 0, 1, 2
+
+
+class WinLossTally:
+    # Flattens match payloads into compact columns (team, event, own score, opponent score) as they
+    # arrive, then works out wins, ties and losses for every team and event in one vectorized pass.
+    # With team_id set only that team's rows are kept, otherwise every team in the matches is counted.
+    def __init__(self, team_id=None):
+        self.team_id = team_id
+        self.team_index = {}
+        self.event_index = {}
+        self.event_ids = []
+        self.event_names = []
+        self.teams = array.array('i')
+        self.events = array.array('i')
+        self.own_scores = array.array('i')
+        self.opponent_scores = array.array('i')
+
+    def add(self, match):
+        # Scheduled matches that haven't been played yet come back as 0-0 and would count as ties
+        if match.get('scored') is False or len(match['alliances']) != 2:
+            return
+        event = match['event']
+        if event['id'] not in self.event_index:
+            self.event_index[event['id']] = len(self.event_names)
+            self.event_ids.append(event['id'])
+            self.event_names.append(event['name'])
+        event_idx = self.event_index[event['id']]
+
+        first, second = match['alliances']
+        for alliance, opponent in ((first, second), (second, first)):
+            for team_data in alliance['teams']:
+                team_id = team_data['team']['id']
+                if self.team_id is not None and team_id != self.team_id:
+                    continue
+                self.teams.append(self.team_index.setdefault(team_id, len(self.team_index)))
+                self.events.append(event_idx)
+                self.own_scores.append(alliance['score'])
+                self.opponent_scores.append(opponent['score'])
+
+    def counts(self):
+        # Returns (team indices, event indices, counts) for every (team, event) pair that actually
+        # played, sorted by team then event; counts is shaped (pairs, 3) holding loss/tie/win.
+        # Pairs are compacted first, so memory follows the number of rows rather than teams x events.
+        event_count = max(1, len(self.event_names))
+        own = np.frombuffer(self.own_scores, dtype=np.int32)
+        opponent = np.frombuffer(self.opponent_scores, dtype=np.int32)
+        outcome = np.sign(own - opponent) + 1
+        group = np.frombuffer(self.teams, dtype=np.int32).astype(np.int64) * event_count + np.frombuffer(self.events, dtype=np.int32)
+        pairs, pair_ids = np.unique(group, return_inverse=True)
+        counts = np.bincount(pair_ids * 3 + outcome, minlength=len(pairs) * 3).reshape(-1, 3)
+        return pairs // event_count, pairs % event_count, counts
+
+    def summarize(self):
+        # {team_id: {'overall': stats, 'events': {event_id: stats}}} for every team seen
+        teams, events, counts = self.counts()
+        if not len(teams):
+            return {}
+        # Pairs are sorted by team, so each team's events are one contiguous run
+        starts = np.flatnonzero(np.r_[True, teams[1:] != teams[:-1]])
+        overall = np.add.reduceat(counts, starts, axis=0)
+        team_ids = list(self.team_index)
+        pair_stats = list(map(_stats, counts.tolist()))
+        bounds = starts.tolist() + [len(teams)]
+        summary = {}
+        for i, (team_idx, stats) in enumerate(zip(teams[starts].tolist(), map(_stats, overall.tolist()))):
+            event_ids = [self.event_ids[event_idx] for event_idx in events[bounds[i]:bounds[i + 1]].tolist()]
+            summary[team_ids[team_idx]] = {'overall': stats, 'events': dict(zip(event_ids, pair_stats[bounds[i]:bounds[i + 1]]))}
+        return summary
+
+    def team_summary(self):
+        # (overall stats, {event name: stats}) for the team this tally was created for. Different
+        # events can share a name, so a repeated name gets its event ID added to stay its own page.
+        result = self.summarize().get(self.team_id)
+        if result is None:
+            return _stats(np.zeros(3, dtype=np.int64)), {}
+        names = [self.event_names[self.event_index[event_id]] for event_id in result['events']]
+        events = {}
+        for name, (event_id, stats) in zip(names, result['events'].items()):
+            events[name if names.count(name) == 1 else f"{name} (#{event_id})"] = stats
+        return result['overall'], events
+
+
+def _stats(row):
+    wins, ties, losses = int(row[WIN]), int(row[TIE]), int(row[LOSS])
+    total_matches = wins + ties + losses
+    win_rate = round((wins / total_matches) * 100, 2) if total_matches > 0 else None
+    return {'wins': wins, 'losses': losses, 'ties': ties, 'win_rate': win_rate}